@@ -0,0 +1,28 @@
+# Loads bot.py / v2.py as a module without starting the bot. The working
+# directory is switched to a fresh temp dir first, so the module's data files
+# never touch the real ones.
+import importlib.util
+import os
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_bot(filename: str = "bot.py"):
+    os.chdir(tempfile.mkdtemp(prefix="panelbot-bench-"))
+    spec = importlib.util.spec_from_file_location("panelbot", os.path.join(ROOT, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def bytes_written() -> int:
+    # bytes this process handed to write() so far (Linux), or -1 where unknown
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return -1
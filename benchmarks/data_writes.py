@@ -0,0 +1,74 @@
+# Burst of invite edits: the old whole-file JSON rewrite per save versus
+# dirty-section tracking with the debounced SQLite flush.
+#
+#   python benchmarks/data_writes.py [--users 20000] [--edits 300] [--file bot.py]
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from _loader import bytes_written, load_bot
+
+
+def legacy(data, edits, users):
+    # what save_data did before the SQLite store: rewrite v2_data.json after every change
+    start, written = time.perf_counter(), bytes_written()
+    size = 0
+    for i in range(edits):
+        data["invites"][str(i % users)] += 1
+        with open("legacy.json", "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        size += os.path.getsize("legacy.json")
+    measured = bytes_written() - written if written >= 0 else size
+    return measured, edits, time.perf_counter() - start
+
+
+async def current(bot, edits, users):
+    flushes = 0
+    save = bot.store.save
+
+    def counting_save(d, sections=None):
+        nonlocal flushes
+        flushes += 1
+        return save(d, sections)
+
+    bot.store.save = counting_save
+    bot.start_background_task("data_flush", bot.data_flush_loop)
+    start, written = time.perf_counter(), bytes_written()
+    for i in range(edits):
+        bot.data["invites"][str(i % users)] += 1
+        await bot.save_data("invites")
+        await asyncio.sleep(0)  # commands yield to the loop between edits
+    await bot.flush_data()
+    elapsed = time.perf_counter() - start
+    measured = bytes_written() - written
+    await bot.stop_background_tasks()
+    return measured, flushes, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--edits", type=int, default=300)
+    parser.add_argument("--file", default="bot.py")
+    args = parser.parse_args()
+
+    bot = load_bot(args.file)
+    bot.data["invites"] = {str(u): 0 for u in range(args.users)}
+    bot.data["client_keys"] = {str(u): f"ptlc_{u:040d}" for u in range(args.users)}
+    bot.store.save(bot.data).result()
+
+    rows = [
+        ("json rewrite per save", legacy(json.loads(json.dumps(bot.data)), args.edits, args.users)),
+        ("dirty sections + flush", asyncio.run(current(bot, args.edits, args.users))),
+    ]
+    bot.store.close()
+    print(f"{args.edits} invite edits, {args.users} users")
+    for name, (written, writes, elapsed) in rows:
+        shown = f"{written / 1e6:9.2f} MB" if written >= 0 else "      n/a"
+        print(f"  {name:24} {shown} written  {writes:4} writes  {elapsed * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
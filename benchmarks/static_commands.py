@@ -0,0 +1,106 @@
+# Dispatch cost of *help / *plans / *botinfo without a gateway connection:
+# building the embed on every call versus the render cache, and what the
+# static cooldown check costs when it lets a call through or drops it, with a
+# given number of users already inside the cooldown window.
+#
+#   python benchmarks/static_commands.py [--calls 20000] [--active 10,1000,10000] [--file bot.py]
+import argparse
+import asyncio
+import time
+from types import SimpleNamespace
+
+from _loader import load_bot
+
+
+def per_call(fn, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls
+
+
+async def per_call_async(fn, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        await fn()
+    return (time.perf_counter() - start) / calls
+
+
+def fake_ctx(user_id, channel_id=1):
+    author = SimpleNamespace(id=user_id, guild_permissions=None, roles=[])
+    message = SimpleNamespace(author=author, channel=SimpleNamespace(id=channel_id), guild=None)
+
+    async def reply(*args, **kwargs):
+        return None
+
+    return SimpleNamespace(author=author, message=message, channel=message.channel, reply=reply)
+
+
+async def cooldown_rows(bot, calls, active):
+    # `active` users have each used a static command within the cooldown window
+    check = bot.help_cmd.checks[0]
+    for limit in bot._static_cooldowns:
+        limit.windows.clear()
+    for uid in range(active):
+        await check(fake_ctx(uid, uid))
+    fresh = iter(range(10**6, 10**9))
+
+    async def allowed():
+        uid = next(fresh)
+        await check(fake_ctx(uid, uid))
+
+    spammer = fake_ctx(0, 0)
+
+    async def dropped():
+        try:
+            await check(spammer)
+        except bot.commands.CommandOnCooldown:
+            pass
+
+    rows = [(f"cooldown dropped, {active} active", await per_call_async(dropped, calls))]
+    # every allowed call adds a user to the window, so keep this run short
+    rows.append((f"cooldown allowed, {active} active", await per_call_async(allowed, min(calls, 200))))
+    return rows
+
+
+async def dispatch_rows(bot, calls, active_counts):
+    rows = []
+    for active in active_counts:
+        rows += await cooldown_rows(bot, calls, active)
+
+    ctx = fake_ctx(0, 0)
+
+    async def help_cached():
+        await bot.help_cmd.callback(ctx)
+
+    rows.append(("*help callback (cached embed)", await per_call_async(help_cached, calls)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--active", default="10,1000,10000", help="users inside the cooldown window, comma separated")
+    parser.add_argument("--file", default="bot.py")
+    args = parser.parse_args()
+
+    bot = load_bot(args.file)
+    help_key = (bot.PREFIX, bot.MADE_BY, bot.SERVER_LOCATION, bot.BOT_VERSION)
+    info_key = (bot.BOT_VERSION, bot.MADE_BY, bot.SERVER_LOCATION)
+    rows = [
+        ("help embed, built per call", per_call(bot.build_help_embed, args.calls)),
+        ("help embed, cached", per_call(lambda: bot.cached_embed("help", help_key, bot.build_help_embed), args.calls)),
+        ("plans embed, built per call", per_call(bot.build_plans_embed, args.calls)),
+        ("plans embed, cached", per_call(lambda: bot.cached_embed("plans", tuple(bot.tiers.plans), bot.build_plans_embed), args.calls)),
+        ("botinfo embed, built per call", per_call(bot.build_botinfo_embed, args.calls)),
+        ("botinfo embed, cached", per_call(lambda: bot.cached_embed("botinfo", info_key, bot.build_botinfo_embed), args.calls)),
+    ]
+    rows += asyncio.run(dispatch_rows(bot, min(args.calls, 2000), [int(n) for n in args.active.split(",")]))
+    bot.store.close()
+    print(f"{args.calls} embed calls, {min(args.calls, 2000)} dispatch calls each")
+    for name, seconds in rows:
+        print(f"  {name:32} {seconds * 1e6:8.2f} µs/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import contextlib
+import importlib.util
+import os
+
+import pytest
+from aiohttp import web
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(params=["bot.py", "v2.py"])
+def panelbot(request, tmp_path, monkeypatch):
+    # a fresh copy of the bot module for every test; its data files land in tmp_path
+    monkeypatch.chdir(tmp_path)
+    spec = importlib.util.spec_from_file_location(f"panelbot_{request.param[:-3]}", os.path.join(ROOT, request.param))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    yield module
+    module.store.close()
+
+
+@contextlib.asynccontextmanager
+async def stand_in_panel(module, routes):
+    # a local aiohttp app playing the panel; the module's PANEL_URL points at it
+    app = web.Application()
+    app.add_routes(routes)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    module.PANEL_URL = f"http://127.0.0.1:{runner.addresses[0][1]}"
+    try:
+        yield app
+    finally:
+        await module.close_http_session()
+        await runner.cleanup()
+
+
+@pytest.fixture
+def panel():
+    return stand_in_panel
@@ -0,0 +1,63 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from aiohttp import web
+
+
+class FakeContext:
+    def __init__(self, author_id):
+        self.author = SimpleNamespace(id=author_id)
+        self.replies = []
+
+    async def reply(self, text):
+        self.replies.append(text)
+
+
+def test_suspend_in_flight_does_not_block_other_commands(panelbot, panel):
+    order = []
+
+    async def slow_suspend(request):
+        await asyncio.sleep(1.0)
+        order.append("suspend")
+        return web.Response(status=204)
+
+    async def users(request):
+        order.append("users")
+        return web.json_response({"data": [], "meta": {"pagination": {"total_pages": 1}}})
+
+    async def main():
+        ctx = FakeContext(int(panelbot.ADMIN_IDS[0]))
+        routes = [
+            web.post("/api/application/servers/{server}/suspend", slow_suspend),
+            web.get("/api/application/users", users),
+        ]
+        async with panel(panelbot, routes):
+            gaps = []
+
+            async def ticker():
+                last = time.monotonic()
+                while True:
+                    await asyncio.sleep(0.02)
+                    now = time.monotonic()
+                    gaps.append(now - last)
+                    last = now
+
+            ticks = asyncio.create_task(ticker())
+            suspend = asyncio.create_task(panelbot.suspend_server.callback(ctx, "7"))
+            await asyncio.sleep(0.2)  # the suspend is now waiting on the panel
+
+            start = time.monotonic()
+            status, js, text = await panelbot.request_app("GET", "/users")
+            assert status == 200
+            assert time.monotonic() - start < 0.5
+            assert not suspend.done()
+
+            await suspend
+            ticks.cancel()
+        assert ctx.replies == ["✅ Server `7` suspended successfully."]
+        # the event loop kept running the whole time
+        assert max(gaps) < 0.2
+
+    asyncio.run(main())
+    assert order == ["users", "suspend"]
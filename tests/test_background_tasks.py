@@ -0,0 +1,23 @@
+import asyncio
+import time
+
+
+def test_background_task_does_not_inherit_the_command_context(panelbot):
+    seen = {}
+
+    async def stream():
+        # what ServerStream.run sees when *console starts it
+        seen["deadline"] = panelbot._command_deadline.get()
+        seen["priority"] = panelbot._command_priority.get()
+        seen["command"] = panelbot._current_command.get()
+
+    async def console_command():
+        # the before_invoke hook ran for this command
+        panelbot._current_command.set("console")
+        panelbot._command_deadline.set(time.monotonic() + panelbot.COMMAND_DEADLINE)
+        panelbot._command_priority.set(1)
+        panelbot.start_background_task("server_stream_abcd1234", stream)
+        await panelbot._background_tasks["server_stream_abcd1234"]
+
+    asyncio.run(console_command())
+    assert seen == {"deadline": None, "priority": 2, "command": None}
@@ -0,0 +1,49 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import aiohttp
+
+
+def record(**overrides):
+    r = {"message": "hi", "guild_id": 1, "requester": "1", "channel_id": None, "message_id": None, "status": "running",
+         "done_until": 0, "delivered": 0, "closed": 0, "failed": 0, "total": 0, "created": time.time(), "finished": None}
+    r.update(overrides)
+    return r
+
+
+def member(member_id, error=None):
+    async def send(text):
+        if error is not None:
+            raise error
+    return SimpleNamespace(id=member_id, bot=False, send=send)
+
+
+def test_send_errors_outside_discord_count_as_failed(panelbot, monkeypatch):
+    members = {m.id: m for m in [member(1), member(2, aiohttp.ClientConnectionError("reset")), member(3),
+                                 member(4, asyncio.TimeoutError()), member(5, RuntimeError("boom")), member(6)]}
+    guild = SimpleNamespace(members=list(members.values()), get_member=members.get)
+    monkeypatch.setattr(panelbot.bot, "get_guild", lambda guild_id: guild)
+    monkeypatch.setattr(panelbot, "BROADCAST_MIN_INTERVAL", 0)
+    panelbot.data["broadcasts"] = {"b1": record()}
+
+    async def main():
+        b = panelbot.broadcasts["b1"] = panelbot.Broadcast("b1", panelbot.data["broadcasts"]["b1"])
+        await b.run()
+
+    asyncio.run(main())
+    r = panelbot.data["broadcasts"]["b1"]
+    assert (r["status"], r["delivered"], r["failed"], r["done_until"]) == ("done", 3, 3, 6)
+    assert r["finished"] is not None
+    assert "b1" not in panelbot.broadcasts
+
+
+def test_finished_broadcasts_are_pruned(panelbot):
+    old = time.time() - panelbot.BROADCAST_RETENTION - 1
+    panelbot.data["broadcasts"] = {
+        "old": record(status="done", finished=old),
+        "recent": record(status="cancelled", finished=time.time()),
+        "running": record(created=old),
+    }
+    panelbot.prune_broadcasts()
+    assert sorted(panelbot.data["broadcasts"]) == ["recent", "running"]
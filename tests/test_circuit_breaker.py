@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+
+
+@pytest.fixture
+def fast_breaker(panelbot, monkeypatch):
+    monkeypatch.setattr(panelbot, "BREAKER_MIN_REQUESTS", 4)
+    monkeypatch.setattr(panelbot, "BREAKER_OPEN_SECONDS", 0.3)
+    monkeypatch.setattr(panelbot, "BREAKER_SLOW_SECONDS", 0.1)
+    return panelbot.breaker
+
+
+class StandIn:
+    # answers every route with the configured status after the configured delay
+    def __init__(self):
+        self.status = 200
+        self.delay = 0.0
+        self.hits = 0
+
+    async def handle(self, request):
+        self.hits += 1
+        await asyncio.sleep(self.delay)
+        return web.json_response({}, status=self.status)
+
+    def routes(self):
+        return [web.route("*", "/{tail:.*}", self.handle)]
+
+
+def test_open_half_open_closed_transitions(panelbot, panel, fast_breaker):
+    stand_in = StandIn()
+
+    async def call():
+        return await panelbot.request_app("GET", "/users", retry=False)
+
+    async def main():
+        async with panel(panelbot, stand_in.routes()):
+            stand_in.status = 500
+            for _ in range(4):
+                assert (await call())[0] == 500
+            assert fast_breaker.state == "open"
+
+            # open: fails fast without reaching the panel, client calls included
+            hits = stand_in.hits
+            status, js, text = await call()
+            assert status == 0 and "circuit open" in text
+            status, js, text = await panelbot.request_client("ptlc_x", "GET", "/servers/abcd1234")
+            assert status == 0 and "circuit open" in text
+            assert stand_in.hits == hits
+
+            # half-open: exactly one probe; others still fail fast meanwhile
+            await asyncio.sleep(0.35)
+            stand_in.status, stand_in.delay = 200, 0.05
+            probe = asyncio.create_task(call())
+            await asyncio.sleep(0.01)
+            assert fast_breaker.state == "half-open"
+            assert (await call())[0] == 0
+            assert (await probe)[0] == 200
+            assert fast_breaker.state == "closed"
+            assert stand_in.hits == hits + 1
+
+            # a failed probe opens it again
+            stand_in.status, stand_in.delay = 500, 0.0
+            for _ in range(4):
+                await call()
+            assert fast_breaker.state == "open"
+            await asyncio.sleep(0.35)
+            assert (await call())[0] == 500
+            assert fast_breaker.state == "open"
+
+    asyncio.run(main())
+
+
+def test_client_api_errors_do_not_open_it(panelbot, panel, fast_breaker):
+    stand_in = StandIn()
+
+    async def main():
+        async with panel(panelbot, stand_in.routes()):
+            stand_in.status = 502  # Run CMD on stopped servers
+            for _ in range(10):
+                ok, msg = await panelbot.client_command("ptlc_x", "abcd1234", "say hi")
+                assert not ok
+            stand_in.status = 500  # a node that is down, on file calls
+            for _ in range(10):
+                await panelbot.request_client("ptlc_x", "GET", "/servers/abcd1234/files/list", retry=False)
+            assert fast_breaker.state == "closed"
+            stand_in.status = 200
+            assert (await panelbot.request_app("GET", "/users"))[0] == 200
+
+    asyncio.run(main())
+
+
+def test_per_server_502_from_application_api_is_not_an_outage(panelbot, panel, fast_breaker):
+    stand_in = StandIn()
+
+    async def main():
+        async with panel(panelbot, stand_in.routes()):
+            stand_in.status = 502
+            for _ in range(6):
+                await panelbot.request_app("DELETE", "/servers/7", retry=False)
+            assert fast_breaker.state == "closed"
+
+    asyncio.run(main())
+
+
+def test_slow_threshold_skips_calls_with_a_longer_timeout(panelbot, panel, fast_breaker):
+    stand_in = StandIn()
+
+    async def main():
+        async with panel(panelbot, stand_in.routes()):
+            stand_in.delay = 0.15
+            for _ in range(4):
+                await panelbot.request_app("POST", "/servers", json_payload={}, timeout=60)
+            assert fast_breaker.state == "closed"
+            for _ in range(4):
+                await panelbot.request_app("POST", "/users", json_payload={})
+            assert fast_breaker.state == "open"
+
+    asyncio.run(main())
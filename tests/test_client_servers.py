@@ -0,0 +1,53 @@
+import asyncio
+
+from aiohttp import web
+
+PAGES = {
+    "1": [{"attributes": {"identifier": "abcd1234", "uuid": "abcd1234-5678-4abc-9def-0123456789ab", "name": "Survival", "server_owner": True}},
+          {"attributes": {"identifier": "abce9999", "name": "Creative", "server_owner": False}}],
+    "2": [{"attributes": {"identifier": "ff00ff00", "name": "Lobby", "server_owner": True, "is_suspended": True}}],
+}
+
+
+def test_resolve_and_shared_fetch(panelbot, panel):
+    fetches = []
+
+    async def servers(request):
+        if request.headers["Authorization"] == "Bearer bad":
+            return web.json_response({}, status=401)
+        fetches.append(request.query["page"])
+        await asyncio.sleep(0.05)
+        return web.json_response({"data": PAGES[request.query["page"]], "meta": {"pagination": {"total_pages": 2}}})
+
+    async def main():
+        cache = panelbot.client_servers
+        async with panel(panelbot, [web.get("/api/client", servers)]):
+            results = await asyncio.gather(*(cache.servers("k") for _ in range(5)))
+            assert fetches == ["1", "2"]
+            assert all(r[0] is results[0][0] for r in results)
+            assert results[0][0]["ff00ff00"]["suspended"]
+            assert not results[0][0]["abce9999"]["owner"]
+
+            assert await cache.resolve("k", "abcd1234") == ("abcd1234", "")
+            assert await cache.resolve("k", "abcd") == ("abcd1234", "")
+            assert await cache.resolve("k", "survival") == ("abcd1234", "")
+            assert await cache.resolve("k", "abcd1234-5678-4abc-9def-0123456789ab") == ("abcd1234", "")
+            assert await cache.resolve("k", "ABCD1234-5678-4ABC-9DEF-0123456789AB") == ("abcd1234", "")
+            found, err = await cache.resolve("k", "abc")
+            assert found is None and "`abcd1234`" in err and "`abce9999`" in err
+            found, err = await cache.resolve("k", "zzzz")
+            assert found is None and "manage list" in err
+            assert fetches == ["1", "2"]  # answered from the cache
+
+            # an unknown identifier refetches once the list is older than the recheck age
+            cache.entries["k"] = (cache.entries["k"][0], cache.entries["k"][1] - panelbot.CLIENT_SERVERS_RECHECK - 1)
+            await cache.resolve("k", "zzzz")
+            assert fetches == ["1", "2", "1", "2"]
+
+            found, err = await cache.resolve("bad", "abcd1234")
+            assert found is None and "rejected" in err
+
+    asyncio.run(main())
+    rendered = panelbot.metrics.render()
+    assert 'client_server_cache_lookups_total{result="miss"}' in rendered
+    assert 'client_server_cache_lookups_total{result="hit"}' in rendered
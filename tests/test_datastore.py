@@ -0,0 +1,43 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+FAIL_ON_B = "CREATE TRIGGER fail_b BEFORE INSERT ON entries WHEN NEW.key = 'b' BEGIN SELECT RAISE(ABORT, 'simulated write failure'); END"
+
+
+def edit(panelbot, section, change):
+    change(panelbot.data[section])
+    panelbot.mark_dirty(section)
+    asyncio.run(panelbot.flush_data())
+
+
+def on_disk(panelbot):
+    return panelbot.DataStore(panelbot.DATA_DB_FILE).load()
+
+
+def fail_next_write_of_b(panelbot):
+    panelbot.data["invites"]["a"] = 1
+    panelbot.mark_dirty("invites")
+    asyncio.run(panelbot.flush_data())
+    with sqlite3.connect(panelbot.DATA_DB_FILE) as conn:
+        conn.execute(FAIL_ON_B)
+    with pytest.raises(sqlite3.Error):
+        edit(panelbot, "invites", lambda invites: invites.update(b=2))
+    with sqlite3.connect(panelbot.DATA_DB_FILE) as conn:
+        conn.execute("DROP TRIGGER fail_b")
+
+
+def test_failed_section_is_rewritten_by_a_flush_of_other_sections(panelbot):
+    fail_next_write_of_b(panelbot)
+    edit(panelbot, "admins", lambda admins: admins.append("42"))
+    edit(panelbot, "invites", lambda invites: invites.update(c=3))
+    assert on_disk(panelbot)["invites"] == {"a": 1, "b": 2, "c": 3}
+
+
+def test_failed_section_is_rewritten_without_new_changes(panelbot):
+    fail_next_write_of_b(panelbot)
+    assert panelbot.store.needs_resync()
+    asyncio.run(panelbot.flush_data())
+    assert not panelbot.store.needs_resync()
+    assert on_disk(panelbot)["invites"] == {"a": 1, "b": 2}
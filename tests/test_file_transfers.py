@@ -0,0 +1,185 @@
+import asyncio
+import os
+from types import SimpleNamespace
+
+from aiohttp import web
+
+
+class FakeResponse:
+    def __init__(self):
+        self.done = False
+        self.sent = []
+        self.modal = None
+
+    def is_done(self):
+        return self.done
+
+    async def defer(self, **kwargs):
+        self.done = True
+
+    async def send_message(self, text, **kwargs):
+        self.done = True
+        self.sent.append(text)
+
+    async def send_modal(self, modal):
+        self.done = True
+        self.modal = modal
+
+
+class FakeFollowup:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, text=None, **kwargs):
+        self.sent.append(text)
+
+
+def respond(**kwargs):
+    async def handler(request):
+        return web.Response(**kwargs)
+    return handler
+
+
+def fake_interaction(user_id=5):
+    return SimpleNamespace(user=SimpleNamespace(id=user_id, guild_permissions=None), channel_id=1,
+                           response=FakeResponse(), followup=FakeFollowup())
+
+
+def test_stream_upload_sends_the_attachment_as_multipart(panelbot, panel):
+    payload = os.urandom(300_000)
+    received = {}
+
+    async def attachment(request):
+        return web.Response(body=payload)
+
+    async def upload(request):
+        reader = await request.multipart()
+        part = await reader.next()
+        received.update(name=part.name, filename=part.filename, body=await part.read(), directory=request.query["directory"])
+        return web.Response(status=204)
+
+    async def main():
+        async with panel(panelbot, [web.get("/attachment", attachment), web.post("/upload", upload)]):
+            base = panelbot.PANEL_URL
+            return await panelbot.stream_upload(f"{base}/attachment", f"{base}/upload", "world.zip", "/plugins")
+
+    ok, text = asyncio.run(main())
+    assert ok and "world.zip" in text
+    assert received == {"name": "files", "filename": "world.zip", "body": payload, "directory": "/plugins"}
+
+
+def test_stream_upload_reports_an_unreadable_attachment(panelbot, panel):
+    async def main():
+        async with panel(panelbot, [web.get("/attachment", respond(status=404))]):
+            return await panelbot.stream_upload(f"{panelbot.PANEL_URL}/attachment", f"{panelbot.PANEL_URL}/upload", "a.txt", "/")
+
+    ok, text = asyncio.run(main())
+    assert not ok and "404" in text
+
+
+def download(panelbot, panel, monkeypatch, handler):
+    monkeypatch.setattr(panelbot, "FILE_MAX_ATTACHMENT", 100_000)
+
+    async def main():
+        async with panel(panelbot, [web.get("/download", handler)]):
+            url = f"{panelbot.PANEL_URL}/download"
+            file, msg = await panelbot.stream_download(url, "latest.log")
+            return file, msg, url
+
+    return asyncio.run(main())
+
+
+def test_stream_download_attaches_small_files(panelbot, panel, monkeypatch):
+    payload = os.urandom(99_000)
+    file, msg, url = download(panelbot, panel, monkeypatch, respond(body=payload))
+    try:
+        assert file.filename == "latest.log" and file.fp.read() == payload
+    finally:
+        file.close()
+
+
+def test_stream_download_links_files_over_the_cap(panelbot, panel, monkeypatch):
+    file, msg, url = download(panelbot, panel, monkeypatch, respond(body=os.urandom(100_001)))
+    assert file is None and url in msg
+
+
+def test_stream_download_stops_reading_at_the_cap_without_a_length(panelbot, panel, monkeypatch):
+    written = []
+
+    async def endless(request):
+        resp = web.StreamResponse()
+        resp.enable_chunked_encoding()
+        await resp.prepare(request)
+        try:
+            for _ in range(1000):
+                await resp.write(b"x" * 64 * 1024)
+                written.append(1)
+        except (ConnectionResetError, asyncio.CancelledError):
+            pass
+        return resp
+
+    file, msg, url = download(panelbot, panel, monkeypatch, endless)
+    assert file is None and url in msg
+    assert len(written) < 1000  # the client hung up instead of draining 64 MB
+
+
+def test_file_ops_are_limited_per_user(panelbot):
+    async def main():
+        release = asyncio.Event()
+
+        async def work():
+            await release.wait()
+
+        running = [asyncio.create_task(panelbot.run_file_op(fake_interaction(), work)) for _ in range(panelbot.FILE_OPS_PER_USER)]
+        await asyncio.sleep(0)
+        busy = fake_interaction()
+        await panelbot.run_file_op(busy, work)
+        assert busy.response.sent and "already have" in busy.response.sent[0]
+        other_user = fake_interaction(user_id=6)
+        other = asyncio.create_task(panelbot.run_file_op(other_user, work))
+        await asyncio.sleep(0)
+        assert not other_user.response.sent
+
+        release.set()
+        await asyncio.gather(*running, other)
+        assert panelbot._file_ops == {}
+
+    asyncio.run(main())
+
+
+def test_upload_takes_its_slot_only_once_the_file_arrives(panelbot, monkeypatch):
+    arrived = None
+    slots_during_transfer = []
+
+    async def wait_for(event, timeout=None, check=None):
+        await arrived.wait()
+        return SimpleNamespace(attachments=[SimpleNamespace(url="http://discord/a", filename="a.jar")])
+
+    async def signed_url(key, identifier, kind, params=None):
+        return "http://node/upload", ""
+
+    async def upload(source, target, filename, directory):
+        slots_during_transfer.append(dict(panelbot._file_ops))
+        return True, f"📤 Uploaded `{filename}`"
+
+    monkeypatch.setattr(panelbot.bot, "wait_for", wait_for)
+    monkeypatch.setattr(panelbot, "client_signed_url", signed_url)
+    monkeypatch.setattr(panelbot, "stream_upload", upload)
+
+    async def main():
+        nonlocal arrived
+        arrived = asyncio.Event()
+        button = fake_interaction()
+        await panelbot.more_upload(button, "key", "abcd1234")
+        modal_submit = fake_interaction()
+        waiting = asyncio.create_task(button.response.modal._on_submit(modal_submit, "/plugins"))
+        await asyncio.sleep(0.05)
+        assert panelbot._file_ops == {}  # waiting for the attachment holds no slot
+
+        arrived.set()
+        await waiting
+        assert slots_during_transfer == [{5: 1}]
+        assert panelbot._file_ops == {}
+        assert modal_submit.followup.sent[-1] == "📤 Uploaded `a.jar`"
+
+    asyncio.run(main())
@@ -0,0 +1,213 @@
+import asyncio
+import itertools
+import json
+from types import SimpleNamespace
+
+from aiohttp import web
+
+_message_ids = itertools.count(100)
+
+
+def fake_message():
+    return SimpleNamespace(id=next(_message_ids), channel=SimpleNamespace(id=3))
+
+
+class FakeContext:
+    def __init__(self, user_id, on_reply=None):
+        self.author = SimpleNamespace(id=user_id)
+        self.on_reply = on_reply
+        self.replies = []
+
+    async def reply(self, text):
+        self.replies.append(text)
+        if self.on_reply is not None:
+            await self.on_reply()
+        return fake_message()
+
+
+def test_panel_calls_go_through_while_streams_are_open(panelbot, panel, monkeypatch):
+    monkeypatch.setattr(panelbot, "HTTP_POOL_LIMIT", 2)
+    monkeypatch.setattr(panelbot, "HTTP_POOL_LIMIT_PER_HOST", 2)
+    monkeypatch.setattr(panelbot, "edit_status_message", lambda *a: asyncio.sleep(0))
+    sockets = []
+
+    async def websocket(request):
+        socket_url = panelbot.PANEL_URL.replace("http", "ws") + "/ws"
+        return web.json_response({"data": {"token": "t", "socket": socket_url}})
+
+    async def ws(request):
+        sock = web.WebSocketResponse()
+        await sock.prepare(request)
+        sockets.append(sock)
+        async for _ in sock:
+            pass
+        return sock
+
+    async def users(request):
+        return web.json_response({"data": []})
+
+    async def main():
+        routes = [web.get("/api/client/servers/{identifier}/websocket", websocket), web.get("/ws", ws),
+                  web.get("/api/application/users", users)]
+        async with panel(panelbot, routes):
+            for i in range(4):
+                stream = panelbot.server_streams[f"srv{i}"] = panelbot.ServerStream(f"srv{i}")
+                stream.watch(fake_message(), 1, "ptlc_x", "console")
+                panelbot.start_background_task(f"server_stream_srv{i}", stream.run)
+            for _ in range(100):
+                if len(sockets) == 4:
+                    break
+                await asyncio.sleep(0.02)
+            assert len(sockets) == 4  # more sockets than the API pool has slots
+            status, js, text = await asyncio.wait_for(panelbot.request_app("GET", "/users"), 2)
+            assert status == 200
+            await panelbot.stop_background_tasks()
+
+    asyncio.run(main())
+
+
+def test_watcher_joins_a_new_stream_when_the_old_one_closes_meanwhile(panelbot, monkeypatch):
+    started = []
+
+    async def manage(ctx, identifier):
+        return "ptlc_x", identifier
+
+    async def request_client(key, method, path, **kwargs):
+        return 200, {"data": {}}, ""
+
+    async def run(self):
+        started.append(self)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            # like ServerStream.run: closed at once, gone from the registry after the last edits
+            self.closed = True
+            await asyncio.sleep(0.05)
+            if panelbot.server_streams.get(self.identifier) is self:
+                del panelbot.server_streams[self.identifier]
+
+    monkeypatch.setattr(panelbot, "_manage_server_or_reply", manage)
+    monkeypatch.setattr(panelbot, "request_client", request_client)
+    monkeypatch.setattr(panelbot.ServerStream, "run", run)
+
+    async def main():
+        old = panelbot.server_streams["abcd1234"] = panelbot.ServerStream("abcd1234")
+        old.watch(fake_message(), 1, "ptlc_x", "console")
+        panelbot.start_background_task("server_stream_abcd1234", old.run)
+        await asyncio.sleep(0)
+
+        async def close_old():
+            # the last viewer goes idle while the reply is being sent
+            panelbot._background_tasks["server_stream_abcd1234"].cancel()
+            await asyncio.sleep(0)
+
+        await panelbot.watch_server_stream(FakeContext(2, close_old), "abcd1234", "console")
+        new = panelbot.server_streams["abcd1234"]
+        assert new is not old and not new.closed
+        assert [v["user_id"] for v in new.viewers.values()] == [2]
+        await asyncio.sleep(0)
+        assert started == [old, new]
+
+        # an open stream is joined, not restarted
+        await panelbot.watch_server_stream(FakeContext(3), "abcd1234", "console")
+        assert panelbot.server_streams["abcd1234"] is new and len(new.viewers) == 2
+        await asyncio.sleep(0)
+        assert started == [old, new]
+
+        monkeypatch.setattr(panelbot, "CONSOLE_MAX_STREAMS", 1)
+        ctx = FakeContext(2)
+        await panelbot.watch_server_stream(ctx, "ffff0000", "console")
+        assert "Too many live views" in ctx.replies[0] and "ffff0000" not in panelbot.server_streams
+        await panelbot.stop_background_tasks()
+
+    asyncio.run(main())
+
+
+def stats_event(cpu, rx, tx, **extra):
+    return json.dumps({"cpu_absolute": cpu, "memory_bytes": 512 * 1024 * 1024, "disk_bytes": 1024 ** 3,
+                       "network": {"rx_bytes": rx, "tx_bytes": tx}, "uptime": 3_723_000, **extra})
+
+
+def test_sample_derives_network_rates(panelbot, monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(panelbot.time, "monotonic", lambda: clock[0])
+    stream = panelbot.ServerStream("abcd1234")
+    stream._sample(stats_event(10, 1000, 500))
+    clock[0] += 2
+    stream._sample(stats_event(20, 5000, 2500))
+    clock[0] += 1
+    stream._sample(stats_event(30, 100, 50))  # the server restarted; its counters did too
+    stream._sample("not json")
+    assert [s[4:] for s in stream.samples] == [(0.0, 0.0), (2000.0, 1000.0), (0.0, 0.0)]
+    assert [s[1] for s in stream.samples] == [10.0, 20.0, 30.0]
+    assert stream.versions == {"console": 0, "stats": 3}
+
+
+def test_render_stats_limits_and_sparklines(panelbot):
+    spark = panelbot._sparkline
+    assert spark([]) == "" and spark([0, 0]) == "▁▁"
+    assert spark([0, 50, 100], 100) == "▁▅█"
+    assert spark([0, 50, 100]) == "▁▅█"  # scaled to the highest value without a limit
+    assert spark([300], 100) == "█"
+
+    stream = panelbot.ServerStream("abcd1234")
+    assert "Waiting for the first sample" in stream.render("stats")
+    stream._sample(stats_event(50, 0, 0))
+    stream._sample(stats_event(50, 0, 0))
+    stream.limits = {"cpu": 200, "memory": 1024, "disk": 4096}
+    rows = stream.render("stats").split("\n")
+    assert rows[2].startswith("CPU       50.0% / 200%") and rows[2].endswith("▃▃")
+    assert "512.0 MB / 1.0 GB" in rows[3] and rows[3].endswith("▅▅")
+    assert "1.0 GB / 4.0 GB" in rows[4]
+    assert rows[6].startswith("Uptime  1h02m  (2 samples)")
+
+    stream.limits = {"cpu": 0, "memory": 0, "disk": 0}  # unlimited
+    rows = stream.render("stats").split("\n")
+    assert "/ ∞" in rows[2] and rows[2].endswith("██")
+    assert "/ ∞" in rows[3] and "/ ∞" in rows[4]
+    stream._sample(stats_event(50, 0, 0, memory_limit_bytes=2 * 1024 ** 3))  # the node's own figure wins
+    assert "512.0 MB / 2.0 GB" in stream.render("stats")
+
+
+def test_render_loop_edits_only_changes_within_the_budget(panelbot, monkeypatch):
+    monkeypatch.setattr(panelbot, "CONSOLE_EDITS_PER_SECOND", 20)  # two viewers: a 0.1s tick
+    monkeypatch.setattr(panelbot, "STATS_REFRESH_INTERVAL", 0.35)
+    edits = []
+
+    async def edit(view, text):
+        edits.append((view["kind"], asyncio.get_running_loop().time(), text))
+
+    monkeypatch.setattr(panelbot, "edit_status_message", edit)
+
+    async def main():
+        stream = panelbot.ServerStream("abcd1234")
+        stream.watch(fake_message(), 1, "ptlc_x", "console")
+        stream.watch(fake_message(), 1, "ptlc_x", "stats")
+        stream._append("hello")
+        start = asyncio.get_running_loop().time()
+        renderer = asyncio.create_task(stream._render_loop())
+        for i in range(24):  # a stats event every 0.05s for 1.2s
+            stream._sample(stats_event(i, 0, 0))
+            if i == 12:
+                stream._append("world")
+            await asyncio.sleep(0.05)
+        console = [e for e in edits if e[0] == "console"]
+        stats = [e for e in edits if e[0] == "stats"]
+        # console: one edit per change, never for stats events
+        assert len(console) == 2 and "world" in console[1][2] and "world" not in console[0][2]
+        # stats: at most one edit per refresh interval, however often samples arrive
+        assert 3 <= len(stats) <= 4
+        assert all(b[1] - a[1] >= 0.34 for a, b in zip(stats, stats[1:]))
+        assert edits[0][1] - start >= 0.09  # nothing before the first tick
+
+        count = len(edits)
+        await asyncio.sleep(0.5)
+        assert len(edits) == count + 1 and edits[-1][0] == "stats"  # the last sample, once
+
+        for v in stream.viewers.values():
+            v["expires"] = 0
+        await asyncio.wait_for(renderer, 1)
+        assert stream.closed and not stream.viewers
+        assert all("view closed (idle)" in e[2] for e in edits[-2:])
+
+    asyncio.run(main())
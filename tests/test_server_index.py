@@ -0,0 +1,43 @@
+import asyncio
+
+from aiohttp import web
+
+
+def server(server_id, identifier, owner=1):
+    return {"attributes": {"id": server_id, "identifier": identifier, "user": owner, "name": identifier}}
+
+
+def test_overlapping_refreshes_share_one_sweep(panelbot, panel):
+    sweeps = []
+
+    async def servers(request):
+        sweeps.append(request.query.get("page"))
+        await asyncio.sleep(0.3)
+        return web.json_response({"data": [server(1, "aaaa1111")], "meta": {"pagination": {"total_pages": 1}}})
+
+    async def main():
+        index = panelbot.server_index
+        async with panel(panelbot, [web.get("/api/application/servers", servers)]):
+            first = asyncio.create_task(index.refresh())
+            await asyncio.sleep(0.1)
+            second = asyncio.create_task(index.refresh())
+            await asyncio.sleep(0.05)
+            # created while the sweep is running; must survive it
+            index.add(server(2, "bbbb2222")["attributes"])
+            assert await first and await second
+        assert sorted(index.by_identifier) == ["aaaa1111", "bbbb2222"]
+        assert index._changes is None
+
+    asyncio.run(main())
+    assert sweeps == ["1"]
+
+
+def test_lookups_are_counted_in_metrics(panelbot):
+    index = panelbot.server_index
+    index.add(server(1, "aaaa1111")["attributes"])
+    assert index.get("aaaa1111") is not None
+    assert index.get("nope") is None
+    assert index.get("nope") is None
+    rendered = panelbot.metrics.render()
+    assert 'server_index_lookups_total{result="hit"} 1' in rendered
+    assert 'server_index_lookups_total{result="miss"} 2' in rendered
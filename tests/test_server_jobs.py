@@ -0,0 +1,67 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from aiohttp import web
+
+SERVER = {"name": "alice_server", "owner_panel_id": 3, "egg_key": "paper", "memory": 1024, "cpu": 100, "disk": 2048, "allocation_id": 5, "node": 1}
+
+
+class FakeContext:
+    author = SimpleNamespace(id=1)
+
+    async def reply(self, text):
+        return SimpleNamespace(id=2, channel=SimpleNamespace(id=3))
+
+
+def test_sendserver_password_is_never_persisted(panelbot):
+    async def main():
+        await panelbot.submit_server_job(FakeContext(), "send", "55", dict(SERVER), secrets={"password": "hunter2"}, email="a@b.c")
+
+    asyncio.run(main())
+    (job_id, job), = panelbot.server_jobs().items()
+    assert "hunter2" not in json.dumps(job)
+    assert "hunter2" not in json.dumps(panelbot.DataStore(panelbot.DATA_DB_FILE).load())
+    assert panelbot._job_secrets[job_id] == {"password": "hunter2"}
+
+
+def run_interrupted_job(panelbot, panel, existing):
+    # a job the bot was running when it stopped; returns (job, bodies POSTed to /servers)
+    posts = []
+
+    async def by_external_id(request):
+        if request.match_info["external_id"] in existing:
+            return web.json_response({"attributes": {"id": 9, "identifier": "abcd1234"}})
+        return web.json_response({"errors": [{"code": "NotFoundHttpException"}]}, status=404)
+
+    async def create(request):
+        posts.append(await request.json())
+        return web.json_response({"attributes": {"id": 10, "identifier": "ffff0000", "name": "alice_server"}}, status=201)
+
+    panelbot.server_jobs()["abc123"] = {
+        "kind": "create", "owner": "55", "requester": "1", "priority": 1, "server": dict(SERVER),
+        "status": "running", "result": "", "created": 1700000000.0, "external_id": "discord-job-abc123-1700000000",
+        "finished": None, "channel_id": None, "message_id": None,
+    }
+
+    async def main():
+        routes = [web.get("/api/application/servers/external/{external_id}", by_external_id),
+                  web.post("/api/application/servers", create)]
+        async with panel(panelbot, routes):
+            await panelbot.run_server_job("abc123")
+
+    asyncio.run(main())
+    return panelbot.server_jobs()["abc123"], posts
+
+
+def test_interrupted_job_recovers_the_server_by_external_id(panelbot, panel):
+    job, posts = run_interrupted_job(panelbot, panel, existing={"discord-job-abc123-1700000000"})
+    assert posts == []
+    assert job["status"] == "done" and "abcd1234" in job["result"]
+
+
+def test_same_named_server_does_not_count_as_created(panelbot, panel):
+    # another server called alice_server exists, but not with this job's external_id
+    job, posts = run_interrupted_job(panelbot, panel, existing={"discord-job-zzz999-1600000000"})
+    assert [p["external_id"] for p in posts] == ["discord-job-abc123-1700000000"]
+    assert job["status"] == "done" and "ffff0000" in job["result"]
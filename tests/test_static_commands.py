@@ -0,0 +1,37 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+
+def fake_ctx(user_id, channel_id):
+    author = SimpleNamespace(id=user_id, guild_permissions=None, roles=[])
+    return SimpleNamespace(author=author, channel=SimpleNamespace(id=channel_id))
+
+
+def test_static_cooldown_windows(panelbot, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(panelbot.time, "monotonic", lambda: clock[0])
+    limit = panelbot.StaticCooldown(2, 10, panelbot.commands.BucketType.channel)
+    assert limit.hit(1) == 0 and limit.hit(1) == 0
+    assert limit.hit(1) == pytest.approx(10)
+    assert limit.hit(2) == 0  # other channels are independent
+    clock[0] += 4
+    assert limit.hit(1) == pytest.approx(6)
+    clock[0] += 6
+    assert limit.hit(1) == 0  # new window
+    clock[0] += 10
+    limit.hit(3)
+    assert set(limit.windows) == {3}  # expired windows are pruned
+
+
+def test_help_spam_is_dropped(panelbot):
+    check = panelbot.help_cmd.checks[0]
+
+    async def main():
+        assert await check(fake_ctx(1, 1))
+        with pytest.raises(panelbot.commands.CommandOnCooldown):
+            await check(fake_ctx(1, 1))
+        assert await check(fake_ctx(2, 1))  # another user in the same channel
+
+    asyncio.run(main())
@@ -0,0 +1,41 @@
+import asyncio
+
+from aiohttp import web
+
+USERS = [
+    {"attributes": {"id": 7, "email": "jimbob@x.com"}},
+    {"attributes": {"id": 8, "email": "Bob@X.com"}},
+]
+
+
+def lookup(panelbot, panel, email, rows):
+    filters = []
+
+    async def users(request):
+        if "filter[email]" not in request.query:
+            # the full sweep; the user was created after it
+            return web.json_response({"data": [], "meta": {"pagination": {"total_pages": 1}}})
+        filters.append(request.query["filter[email]"])
+        needle = request.query["filter[email]"].lower()
+        return web.json_response({"data": [u for u in rows if needle in u["attributes"]["email"].lower()]})
+
+    async def main():
+        async with panel(panelbot, [web.get("/api/application/users", users)]):
+            first = await panelbot.find_panel_user_by_email(email)
+            again = await panelbot.find_panel_user_by_email(email)
+            return first, again
+
+    first, again = asyncio.run(main())
+    assert first == again
+    assert filters == [email]  # the second lookup was answered from the cache
+    return first
+
+
+def test_partial_filter_matches_pick_the_exact_email(panelbot, panel):
+    assert lookup(panelbot, panel, "bob@x.com", USERS) == 8
+
+
+def test_only_partial_matches_cache_no_user(panelbot, panel):
+    assert lookup(panelbot, panel, "bob@x.com", USERS[:1]) is None
+    assert panelbot.user_cache.get("bob@x.com") == (True, None)
+    assert panelbot.user_cache.get("jimbob@x.com") == (True, 7)
@@ -1,14 +1,34 @@
 # v2.py — All-in-one Discord bot for Pterodactyl (prefix "*")
 # Requirements:
-#   pip install discord.py aiohttp
-# Edit CONFIG below before running.
+#   pip install "discord.py>=2.4" aiohttp
+# Edit CONFIG below before running. Tests: pip install pytest; python -m pytest
 
 import os
 import json
+import copy
 import asyncio
 import datetime
-from typing import Dict, Any, Optional, List, Tuple
+import time
+import sqlite3
+import threading
+import concurrent.futures
+import contextvars
+import re
+import random
+import heapq
+import itertools
+import csv
+import io
+import fnmatch
+import difflib
+import bisect
+import email.utils
+import posixpath
+import tempfile
+from collections import deque
+from typing import Dict, Any, Optional, List, Tuple, AsyncIterator, Callable, NamedTuple, Iterable
 import aiohttp
+from aiohttp import web
 import discord
 from discord.ext import commands
 
@@ -31,37 +51,465 @@ BOT_VERSION = "27.6v"
 MADE_BY = "Gamerzhacker"
 SERVER_LOCATION = "India"
 
-# data file
-DATA_FILE = "v2_data.json"
+# data files
+DATA_FILE = "v2_data.json"        # legacy JSON store, migrated into DATA_DB_FILE once
+DATA_DB_FILE = "v2_data.sqlite3"  # SQLite (WAL) store used at runtime
+DATA_FLUSH_INTERVAL = 0.5         # seconds; changed sections are written at most this often
+DATA_FLUSH_MAX_MUTATIONS = 50     # ...or as soon as this many changes are pending
+DURABLE_COMMANDS = {"register", "admin create_a"}  # commands whose saves wait for the commit
+
+# metrics (Prometheus text format on http://METRICS_HOST:METRICS_PORT/metrics; port 0 disables)
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = 9108
+
+# panel HTTP client (one pooled keep-alive session per process)
+HTTP_POOL_LIMIT = 100           # max open connections in total
+HTTP_POOL_LIMIT_PER_HOST = 20   # max open connections to the panel host
+HTTP_DNS_CACHE_TTL = 300        # seconds to cache DNS lookups
+HTTP_KEEPALIVE_TIMEOUT = 30     # seconds an idle connection is kept open
+PANEL_PAGE_SIZE = 100           # per_page for Application API list endpoints
+PANEL_PAGE_PREFETCH = 4         # list pages requested ahead of the consumer
+
+# panel request retries (GET/HEAD/OPTIONS/PUT/DELETE by default, POST/PATCH only with retry=True)
+RETRY_MAX_ATTEMPTS = 4          # attempts per request, the first one included
+RETRY_BASE_DELAY = 0.5          # seconds; doubled per retry, with full jitter
+RETRY_MAX_DELAY = 10.0          # longest single wait; a longer Retry-After is not waited out
+RETRY_STATUSES = {429, 502, 503, 504}
+COMMAND_DEADLINE = 90           # seconds one command may spend on panel calls including retries
+
+# client-side rate limits per API key (match the panel's APP/CLIENT_API_RATELIMIT); excess requests queue
+RATE_LIMIT_APP_PER_MINUTE = 240     # application key (PANEL_API_KEY)
+RATE_LIMIT_CLIENT_PER_MINUTE = 720  # each user's client key
+RATE_LIMIT_BURST = 20               # requests a key may send back-to-back
+
+# circuit breaker: stop calling the panel while it is down (Application API outcomes drive it)
+BREAKER_WINDOW = 30          # seconds of recent Application API requests considered
+BREAKER_MIN_REQUESTS = 10    # requests needed in the window before the breaker may open
+BREAKER_ERROR_RATE = 0.5     # share of failed requests (5xx, timeout, network, slow) that opens it
+BREAKER_SLOW_SECONDS = 10    # a request slower than this counts as failed, unless it was given more than the default 30s
+BREAKER_OPEN_SECONDS = 30    # how long it stays open before one probe request is let through
+
+# free allocation pool
+ALLOCATION_REFRESH_INTERVAL = 120  # seconds between background refreshes of free allocations
+ALLOCATION_LEASE_SECONDS = 120     # a reserved allocation is dropped if not confirmed in time
+
+# server placement across nodes
+PLACEMENT_NODE_IDS: List[str] = []    # nodes new servers may go to; empty = every node on the panel
+PLACEMENT_STRATEGY = "least_loaded"   # bin_pack | spread | least_loaded
+NODE_STATS_TTL = 60                   # seconds cached node capacity stays fresh
+NODE_STATS_INTERVAL = 60              # seconds between background sweeps of /nodes (*node, placement)
+
+# panel user lookups by email
+USER_CACHE_TTL = 600          # seconds a cached email -> panel user id stays valid
+USER_CACHE_NEGATIVE_TTL = 30  # seconds an email that matched no panel user is remembered
+
+# servers each linked client key can reach (*manage, *console, *stats)
+CLIENT_SERVERS_TTL = 300      # seconds a key's server list stays fresh
+CLIENT_SERVERS_RECHECK = 15   # an unknown identifier refetches the list once it is older than this
+CLIENT_BULK_PARALLELISM = 5   # power calls in flight for "*manage <signal> all"
+
+# server creation jobs (*create / *sendserver)
+SERVER_JOB_WORKERS = 3            # servers created concurrently
+SERVER_JOB_RETENTION = 86400      # seconds a finished job can still be looked up with *job
+
+# *admin bulk_create
+BULK_CREATE_PARALLELISM = 5       # servers created at once
+BULK_CREATE_MAX_ROWS = 500        # rows accepted from one manifest
+
+# *drop broadcasts (discord.py already waits out Discord's rate-limit headers; this paces on top)
+BROADCAST_CONCURRENCY = 4         # DMs in flight at once
+BROADCAST_MIN_INTERVAL = 0.25     # seconds between DM starts; doubled after a 429, eased back after successes
+BROADCAST_MAX_INTERVAL = 30.0
+BROADCAST_STATUS_INTERVAL = 10    # seconds between edits of the progress message
+BROADCAST_CHECKPOINT_EVERY = 100  # recipients between saved checkpoints
+BROADCAST_RETENTION = 86400       # seconds a finished broadcast's record is kept
+
+# control panel file tools ("More" buttons)
+FILE_CHUNK_SIZE = 64 * 1024             # bytes per chunk when streaming files between Discord and the panel
+FILE_MAX_ATTACHMENT = 8 * 1024 * 1024   # bigger downloads are answered with the panel's signed link instead
+FILE_TRANSFER_IDLE_TIMEOUT = 60         # seconds a transfer may stall before it is aborted
+FILE_EDIT_MAX_BYTES = 4000              # editable in a Discord text input (4000 characters at most)
+FILE_LIST_PAGE_SIZE = 20                # entries per page of a directory listing
+FILE_OPS_PER_USER = 2                   # file operations one user may have running at once
+FILE_UPLOAD_WAIT = 120                  # seconds to wait for the attachment after choosing Upload
+
+# *console / *stats live views (one panel websocket per server)
+CONSOLE_LINES = 25                # console lines kept in the rolling buffer
+CONSOLE_EDITS_PER_SECOND = 1.0    # message edits per second for one server's live views, shared by all viewers
+CONSOLE_IDLE_TIMEOUT = 600        # seconds a viewer's message keeps updating; running *console again extends it
+CONSOLE_RECONNECTS = 3            # reconnect attempts after the websocket drops
+CONSOLE_MAX_STREAMS = 50          # servers with a live console/stats view at once (one websocket each)
+STATS_HISTORY = 30                # stats samples kept per server for the *stats sparklines
+STATS_REFRESH_INTERVAL = 5        # seconds between edits of one *stats dashboard
+
+# server index and bulk lifecycle operations (*admin bulk)
+SERVER_INDEX_TTL = 300            # seconds between full refreshes of the server index
+BULK_ACTION_PARALLELISM = 10      # panel calls in flight for one bulk operation (the rate limiter still applies)
+
+# invite plans: (name, invites needed, RAM MB, CPU %, disk MB); they also cap what *create may ask for
+PLANS = [
+    ("Basic", 0, 4096, 150, 10000),
+    ("Advanced", 4, 6144, 200, 15000),
+    ("Pro", 6, 7168, 230, 20000),
+    ("Premium", 8, 9216, 270, 25000),
+    ("Elite", 15, 12288, 320, 30000),
+    ("Ultimate", 20, 16384, 400, 35000),
+]
+
+# help/plans/botinfo cooldowns (admins are exempt); calls inside a cooldown get no answer
+STATIC_USER_COOLDOWN = 5      # seconds between answers to the same user
+STATIC_CHANNEL_RATE = 3       # answers per channel...
+STATIC_CHANNEL_PER = 10       # ...per this many seconds
 
 # prefix and intents
 PREFIX = "*"
 intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True
-bot = commands.Bot(command_prefix=PREFIX, intents=intents, help_command=None)
+
+class PanelBot(commands.Bot):
+    async def setup_hook(self) -> None:
+        # control panel buttons, including those on panels posted before a restart
+        self.add_dynamic_items(ServerButton)
+
+    async def on_command_error(self, ctx: commands.Context, error: commands.CommandError) -> None:
+        if isinstance(error, commands.CommandOnCooldown):
+            return  # repeated static commands: the previous answer is still on screen
+        await super().on_command_error(ctx, error)
+
+    async def close(self) -> None:
+        await super().close()
+        await stop_background_tasks()
+        await flush_data()
+        await close_http_session()
+        await asyncio.get_running_loop().run_in_executor(None, store.close)
+
+bot = PanelBot(command_prefix=PREFIX, intents=intents, help_command=None)
 
 # =========================
 # persistence utilities
 # =========================
+# Every top-level key of `data` is a section. Dict sections are stored one row
+# per entry and list sections (admins, locked_channels) as a set of members, so
+# a save only writes the entries that changed since the previous one.
+class DataStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._shadow: Dict[str, Tuple[str, Dict[str, Any]]] = {}  # last persisted: section -> (kind, rows)
+        self._resync: set = set()   # sections whose last write failed
+        self._pending: List[Tuple[list, concurrent.futures.Future]] = []
+        self._scheduled = False
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None  # owned by the writer thread
+        self._writer = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="datastore")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS sections (name TEXT PRIMARY KEY, kind TEXT NOT NULL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS entries (section TEXT NOT NULL, key TEXT NOT NULL, value TEXT, PRIMARY KEY (section, key)) WITHOUT ROWID")
+        return conn
+
+    @staticmethod
+    def _rows(value: Any) -> Tuple[str, Dict[str, Any]]:
+        if isinstance(value, dict):
+            return "dict", {str(k): v for k, v in value.items()}
+        if isinstance(value, list):
+            return "list", {json.dumps(item): None for item in value}
+        return "value", {"": value}
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        # None means the database is empty (first run or pre-migration)
+        conn = self._connect()
+        try:
+            kinds = dict(conn.execute("SELECT name, kind FROM sections"))
+            if not kinds:
+                return None
+            d: Dict[str, Any] = {name: {} if kind == "dict" else [] for name, kind in kinds.items()}
+            for section, key, value in conn.execute("SELECT section, key, value FROM entries"):
+                kind = kinds.get(section)
+                if kind == "dict":
+                    d[section][key] = json.loads(value)
+                elif kind == "list":
+                    d[section].append(json.loads(key))
+                elif kind == "value":
+                    d[section] = json.loads(value)
+        finally:
+            conn.close()
+        for name, value in d.items():
+            kind, rows = self._rows(value)
+            self._shadow[name] = (kind, copy.deepcopy(rows))
+        return d
+
+    def _diff(self, d: Dict[str, Any], sections) -> list:
+        changes = []
+        with self._lock:
+            resync, self._resync = self._resync, set()
+        # sections whose last write failed are rewritten whole with this save,
+        # whether or not the caller asked for them
+        sections = list(sections) + [s for s in resync if s not in sections]
+        for section in sections:
+            if section not in d:
+                if section in self._shadow:
+                    del self._shadow[section]
+                    changes.append(("drop", section, None, None))
+                continue
+            kind, rows = self._rows(d[section])
+            old_kind, old = self._shadow.get(section, (None, {}))
+            if old_kind != kind or section in resync:
+                changes.append(("drop", section, None, None))
+                changes.append(("kind", section, kind, None))
+                old = {}
+            for k, v in rows.items():
+                if k not in old or old[k] != v:
+                    changes.append(("put", section, k, None if kind == "list" else json.dumps(v)))
+                    old[k] = copy.deepcopy(v)
+            for k in [k for k in old if k not in rows]:
+                changes.append(("del", section, k, None))
+                del old[k]
+            self._shadow[section] = (kind, old)
+        return changes
+
+    def needs_resync(self) -> bool:
+        with self._lock:
+            return bool(self._resync)
+
+    def save(self, d: Dict[str, Any], sections=None) -> concurrent.futures.Future:
+        # diffs on the caller's thread, writes on the writer thread; queued saves
+        # are committed together in one transaction
+        changes = self._diff(d, list(sections) if sections is not None else set(d) | set(self._shadow))
+        fut: concurrent.futures.Future = concurrent.futures.Future()
+        if not changes:
+            fut.set_result(0)
+            return fut
+        with self._lock:
+            self._pending.append((changes, fut))
+            if not self._scheduled:
+                self._scheduled = True
+                self._writer.submit(self._drain)
+        return fut
+
+    def _drain(self) -> None:
+        with self._lock:
+            batch, self._pending, self._scheduled = self._pending, [], False
+        try:
+            if self._conn is None:
+                self._conn = self._connect()
+            with self._conn:
+                for changes, _ in batch:
+                    for op, section, key, value in changes:
+                        if op == "put":
+                            self._conn.execute("INSERT OR REPLACE INTO entries (section, key, value) VALUES (?, ?, ?)", (section, key, value))
+                        elif op == "del":
+                            self._conn.execute("DELETE FROM entries WHERE section = ? AND key = ?", (section, key))
+                        elif op == "kind":
+                            self._conn.execute("INSERT OR REPLACE INTO sections (name, kind) VALUES (?, ?)", (section, key))
+                        elif op == "drop":
+                            self._conn.execute("DELETE FROM entries WHERE section = ?", (section,))
+                            self._conn.execute("DELETE FROM sections WHERE name = ?", (section,))
+        except Exception as e:
+            print(f"⚠️ Saving data failed: {e}")
+            with self._lock:
+                self._resync.update(section for changes, _ in batch for _, section, _, _ in changes)
+            for _, fut in batch:
+                fut.set_exception(e)
+            return
+        for changes, fut in batch:
+            fut.set_result(len(changes))
+
+    def close(self) -> None:
+        # blocks until queued writes are committed
+        self._writer.submit(self._close_conn)
+        self._writer.shutdown(wait=True)
+
+    def _close_conn(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+store = DataStore(DATA_DB_FILE)
+
 def load_data() -> Dict[str, Any]:
+    d = store.load()
+    if d is not None:
+        return d
     if not os.path.exists(DATA_FILE):
-        return {
+        d = {
             "admins": [str(i) for i in BOOTSTRAP_ADMIN_IDS],
             "invites": {},        # user_id -> int
             "client_keys": {},    # user_id -> client api key
             "panel_users": {},    # discord_user_id -> panel_user_id
             "locked_channels": [] # list of channel ids (strings)
         }
+        store.save(d).result()
+        return d
+    # one-shot migration from the JSON file
     with open(DATA_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-def save_data(d: Dict[str, Any]) -> None:
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(d, f, indent=2)
+        d = json.load(f)
+    store.save(d).result()
+    os.replace(DATA_FILE, DATA_FILE + ".migrated")
+    print(f"✅ Migrated {DATA_FILE} into {DATA_DB_FILE}")
+    return d
 
 data = load_data()
 
+# Mutations mark the sections they touched; data_flush_loop writes them out in
+# batches. Commands in DURABLE_COMMANDS (or durable=True) wait for the commit.
+_dirty_sections: set = set()
+_dirty_count = 0
+_last_flush: Optional[concurrent.futures.Future] = None
+_current_command: contextvars.ContextVar = contextvars.ContextVar("current_command", default=None)
+_command_deadline: contextvars.ContextVar = contextvars.ContextVar("command_deadline", default=None)
+# rate limiter lane: 0 admin commands, 1 user commands, 2 background work
+_command_priority: contextvars.ContextVar = contextvars.ContextVar("command_priority", default=2)
+
+@bot.before_invoke
+async def _track_command(ctx: commands.Context):
+    _current_command.set(ctx.command.qualified_name if ctx.command else None)
+    _command_deadline.set(time.monotonic() + COMMAND_DEADLINE)
+    _command_priority.set(0 if is_admin_member(ctx.author) else 1)
+
+def mark_dirty(*sections: str) -> None:
+    global _dirty_count
+    _dirty_sections.update(sections or data.keys())
+    _dirty_count += 1
+    if _dirty_count >= DATA_FLUSH_MAX_MUTATIONS:
+        start_background_task("data_flush_now", flush_data)
+
+async def flush_data() -> None:
+    # writes the dirty sections and waits until everything queued so far is
+    # committed (the store's writer commits in order)
+    global _dirty_count, _last_flush
+    fut = _last_flush
+    if _dirty_sections or store.needs_resync():
+        sections = set(_dirty_sections)
+        _dirty_sections.clear()
+        _dirty_count = 0
+        fut = _last_flush = store.save(data, sections)
+    if fut is None:
+        return
+    try:
+        await asyncio.wrap_future(fut)
+    finally:
+        if _last_flush is fut:
+            _last_flush = None
+
+async def save_data(*sections: str, durable: bool = False) -> None:
+    mark_dirty(*sections)
+    if durable or _current_command.get() in DURABLE_COMMANDS:
+        await flush_data()
+
+async def data_flush_loop() -> None:
+    while True:
+        await asyncio.sleep(DATA_FLUSH_INTERVAL)
+        try:
+            await flush_data()
+        except Exception:
+            pass  # already reported by the store; the sections are rewritten next time
+
+# =========================
+# Metrics
+# =========================
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+_IDENTIFIER_SEGMENT = re.compile(r"^[0-9a-f]{8}(-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})?$")
+
+def endpoint_template(path: str) -> str:
+    # /servers/12/suspend -> /servers/{id}/suspend, /servers/1a2b3c4d/power -> /servers/{identifier}/power
+    parts = []
+    for seg in path.split("/"):
+        if seg.isdigit():
+            parts.append("{id}")
+        elif _IDENTIFIER_SEGMENT.match(seg):
+            parts.append("{identifier}")
+        else:
+            parts.append(seg)
+    return "/".join(parts)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+class Metrics:
+    def __init__(self):
+        self.kinds: Dict[str, Tuple[str, str]] = {}  # name -> (type, help)
+        self.values: Dict[str, Dict[LabelKey, Any]] = {}
+
+    def _series(self, name: str, kind: str, help_text: str) -> Dict[LabelKey, Any]:
+        if name not in self.kinds:
+            self.kinds[name] = (kind, help_text)
+            self.values[name] = {}
+        return self.values[name]
+
+    def inc(self, name: str, labels: Dict[str, Any], value: float = 1, help_text: str = "") -> None:
+        series = self._series(name, "counter", help_text)
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, labels: Dict[str, Any], value: float, help_text: str = "") -> None:
+        series = self._series(name, "gauge", help_text)
+        series[tuple(sorted((k, str(v)) for k, v in labels.items()))] = value
+
+    def observe(self, name: str, labels: Dict[str, Any], value: float, help_text: str = "") -> None:
+        series = self._series(name, "histogram", help_text)
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        h = series.get(key)
+        if h is None:
+            h = series[key] = {"buckets": [0] * len(LATENCY_BUCKETS), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                h["buckets"][i] += 1
+                break
+        h["sum"] += value
+        h["count"] += 1
+
+    def render(self) -> str:
+        def fmt(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+            pairs = key + extra
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+        lines = []
+        for name, (kind, help_text) in self.kinds.items():
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key, value in self.values[name].items():
+                if kind != "histogram":
+                    lines.append(f"{name}{fmt(key)} {value}")
+                    continue
+                cumulative = 0
+                for bound, n in zip(LATENCY_BUCKETS, value["buckets"]):
+                    cumulative += n
+                    lines.append(f"{name}_bucket{fmt(key, (('le', str(bound)),))} {cumulative}")
+                lines.append(f"{name}_bucket{fmt(key, (('le', '+Inf'),))} {value['count']}")
+                lines.append(f"{name}_sum{fmt(key)} {value['sum']:.6f}")
+                lines.append(f"{name}_count{fmt(key)} {value['count']}")
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
+
+def histogram_quantile(h: Dict[str, Any], q: float) -> float:
+    # upper bound of the bucket holding the q-th observation
+    target = q * h["count"]
+    seen = 0
+    for bound, n in zip(LATENCY_BUCKETS, h["buckets"]):
+        seen += n
+        if seen >= target:
+            return bound
+    return float("inf")
+
+async def metrics_server() -> None:
+    async def handle(request: web.Request) -> web.Response:
+        return web.Response(text=metrics.render(), content_type="text/plain", charset="utf-8")
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, METRICS_HOST, METRICS_PORT).start()
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
 # =========================
 # Application API helper
 # =========================
@@ -71,23 +519,358 @@ APP_HEADERS = {
     "Accept": "application/vnd.pterodactyl.v1+json",
 }
 
+_http_session: Optional[aiohttp.ClientSession] = None
+
+def get_http_session() -> aiohttp.ClientSession:
+    # lazily created inside the running loop, reused for every panel call
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_POOL_LIMIT,
+            limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+            use_dns_cache=True,
+            ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+            keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+        )
+        _http_session = aiohttp.ClientSession(connector=connector)
+    return _http_session
+
+_stream_session: Optional[aiohttp.ClientSession] = None
+
+def get_stream_session() -> aiohttp.ClientSession:
+    # websockets and file transfers hold a connection for minutes; they get their
+    # own pool so they never take the slots API calls queue for
+    global _stream_session
+    if _stream_session is None or _stream_session.closed:
+        connector = aiohttp.TCPConnector(limit=0, use_dns_cache=True, ttl_dns_cache=HTTP_DNS_CACHE_TTL)
+        _stream_session = aiohttp.ClientSession(connector=connector)
+    return _stream_session
+
+async def close_http_session() -> None:
+    global _http_session, _stream_session
+    for session in (_http_session, _stream_session):
+        if session is not None and not session.closed:
+            await session.close()
+    _http_session = _stream_session = None
+
+class PanelError(Exception):
+    pass
+
 def app_url(path: str) -> str:
     # path must start with '/'
     return f"{PANEL_URL}/api/application{path}"
 
-async def request_app(method: str, path: str, json_payload: dict = None, params: dict = None, timeout: int = 30) -> Tuple[int, Optional[dict], str]:
-    url = app_url(path)
-    async with aiohttp.ClientSession() as session:
+class TokenBucket:
+    # requests that find the bucket empty wait in a priority queue (lower lane first)
+    depth: Dict[str, int] = {}  # queued requests per api, summed over keys
+
+    def __init__(self, api: str, per_minute: float, burst: int):
+        self.api = api
+        self.rate = per_minute / 60.0
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _set_depth(self, delta: int) -> None:
+        TokenBucket.depth[self.api] = TokenBucket.depth.get(self.api, 0) + delta
+        metrics.set("panel_ratelimit_queue_depth", {"api": self.api}, TokenBucket.depth[self.api],
+                    help_text="Panel requests waiting for a rate limit token")
+
+    def _schedule(self) -> None:
+        if self._timer is None and self.waiters:
+            delay = max(0.0, (1 - self.tokens) / self.rate)
+            self._timer = asyncio.get_running_loop().call_later(delay, self._wake)
+
+    def _wake(self) -> None:
+        self._timer = None
+        self._refill()
+        while self.waiters and self.tokens >= 1:
+            _, _, fut = heapq.heappop(self.waiters)
+            if fut.done():  # caller was cancelled
+                continue
+            self.tokens -= 1
+            fut.set_result(None)
+        self._schedule()
+
+    async def acquire(self, priority: int) -> None:
+        self._refill()
+        if not self.waiters and self.tokens >= 1:
+            self.tokens -= 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiters, (priority, next(self._seq), fut))
+        metrics.inc("panel_ratelimit_queued_total", {"api": self.api}, help_text="Panel requests that had to wait for a rate limit token")
+        self._set_depth(1)
+        self._schedule()
         try:
-            async with session.request(method, url, headers=APP_HEADERS, json=json_payload, params=params, timeout=timeout) as resp:
-                text = await resp.text()
-                try:
-                    js = await resp.json()
-                except Exception:
-                    js = None
-                return resp.status, js, text
-        except Exception as e:
-            return 0, None, f"request-exception: {e}"
+            await fut
+        finally:
+            self._set_depth(-1)
+
+    def drain(self) -> None:
+        # the panel answered 429: stop bursting on this key until tokens refill
+        self._refill()
+        self.tokens = min(self.tokens, 0.0)
+
+_rate_buckets: Dict[str, TokenBucket] = {}
+
+def rate_bucket(api: str, headers: Dict[str, str]) -> TokenBucket:
+    key = headers.get("Authorization", "")
+    bucket = _rate_buckets.get(key)
+    if bucket is None:
+        per_minute = RATE_LIMIT_APP_PER_MINUTE if api == "app" else RATE_LIMIT_CLIENT_PER_MINUTE
+        bucket = _rate_buckets[key] = TokenBucket(api, per_minute, RATE_LIMIT_BURST)
+    return bucket
+
+class CircuitBreaker:
+    # closed: requests flow and outcomes are tracked; open: requests fail fast;
+    # half-open: a single probe is let through and decides which way to go
+    STATE_VALUES = {"closed": 0, "half-open": 1, "open": 2}
+
+    def __init__(self):
+        self.state = "closed"
+        self.events: deque = deque()  # (time, failed) within BREAKER_WINDOW
+        self.failures = 0
+        self.opened_at = 0.0
+        self.changed_at = time.monotonic()
+        self.reason = ""
+        self.probing = False
+
+    def _set(self, state: str, reason: str = "") -> None:
+        if state == self.state:
+            return
+        print(f"⚡ Panel circuit breaker {self.state} -> {state}" + (f" ({reason})" if reason else ""))
+        metrics.inc("panel_breaker_transitions_total", {"to": state}, help_text="Circuit breaker state changes")
+        self.state, self.changed_at, self.reason = state, time.monotonic(), reason
+        metrics.set("panel_breaker_state", {}, self.STATE_VALUES[state], help_text="Circuit breaker state (0 closed, 1 half-open, 2 open)")
+        if state == "open":
+            self.opened_at = self.changed_at
+        self.events.clear()
+        self.failures = 0
+        self.probing = False
+
+    def retry_in(self) -> float:
+        return max(0.0, self.opened_at + BREAKER_OPEN_SECONDS - time.monotonic())
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            if self.retry_in() > 0:
+                return False
+            self._set("half-open")
+        if self.probing:
+            return False
+        self.probing = True
+        return True
+
+    def holding(self) -> bool:
+        # client API calls fail fast while open but never act as the probe
+        return self.state == "open" and self.retry_in() > 0
+
+    def release_probe(self) -> None:
+        # the probe was cancelled before it produced an outcome
+        if self.state == "half-open":
+            self.probing = False
+
+    def record(self, failed: bool) -> None:
+        if self.state == "half-open":
+            if failed:
+                self._set("open", "probe failed")
+            else:
+                self._set("closed", "probe succeeded")
+            return
+        if self.state == "open":
+            return  # answers to requests sent before it opened
+        now = time.monotonic()
+        self.events.append((now, failed))
+        self.failures += failed
+        while self.events and self.events[0][0] < now - BREAKER_WINDOW:
+            self.failures -= self.events.popleft()[1]
+        if len(self.events) >= BREAKER_MIN_REQUESTS and self.failures / len(self.events) >= BREAKER_ERROR_RATE:
+            self._set("open", f"{self.failures}/{len(self.events)} requests failed in {BREAKER_WINDOW}s")
+
+breaker = CircuitBreaker()
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    # Retry-After is either delay-seconds or an HTTP date
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+        return max(0.0, (when - datetime.datetime.now(when.tzinfo)).total_seconds())
+    except Exception:
+        return None
+
+def _breaker_failure(path: str, status: int, outcome: str, elapsed: float, slow_after: Optional[float]) -> bool:
+    if not outcome.endswith("xx"):
+        return True  # timeout or network error
+    if status == 502 and path.startswith("/servers/"):
+        return False  # the panel answered; the server's node did not
+    return outcome == "5xx" or (slow_after is not None and elapsed > slow_after)
+
+async def _panel_attempt(api: str, method: str, path: str, headers: Dict[str, str], json_payload: dict, params: dict, timeout: float, body: Any = None, slow_after: Optional[float] = BREAKER_SLOW_SECONDS) -> Tuple[int, Optional[dict], str, Optional[float], bool]:
+    # one request: (status, json, text, Retry-After seconds, transient network failure)
+    url = app_url(path) if api == "app" else f"{PANEL_URL}/api/client{path}"
+    # Only Application API outcomes drive the breaker. Client API calls are
+    # proxied to Wings, so their 5xx and slow answers (server offline, node
+    # down, big file transfers) describe one server, not the panel.
+    gated = api == "app"
+    if (not breaker.allow()) if gated else breaker.holding():
+        metrics.inc("panel_breaker_rejected_total", {"api": api}, help_text="Panel requests failed fast by the open circuit breaker")
+        return 0, None, f"panel unavailable (circuit open, next probe in {breaker.retry_in():.0f}s)", None, False
+    bucket = rate_bucket(api, headers)
+    try:
+        await bucket.acquire(_command_priority.get())
+    except BaseException:
+        if gated:
+            breaker.release_probe()
+        raise
+    session = get_http_session()
+    outcome = "cancelled"
+    status = 0
+    start = time.monotonic()
+    try:
+        async with session.request(method, url, headers=headers, json=json_payload, data=body, params=params, timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+            status = resp.status
+            text = await resp.text()
+            outcome = f"{resp.status // 100}xx"
+            if resp.status == 429:
+                bucket.drain()
+            try:
+                js = json.loads(text) if text else None
+            except Exception:
+                js = None
+            return resp.status, js, text, _parse_retry_after(resp.headers.get("Retry-After")), False
+    except asyncio.TimeoutError:
+        outcome = "timeout"
+        return 0, None, f"request-exception: timed out after {timeout:.0f}s", None, True
+    except Exception as e:
+        outcome = type(e).__name__
+        return 0, None, f"request-exception: {e}", None, isinstance(e, aiohttp.ClientConnectionError)
+    finally:
+        elapsed = time.monotonic() - start
+        if gated and outcome == "cancelled":
+            breaker.release_probe()
+        elif gated:
+            breaker.record(_breaker_failure(path, status, outcome, elapsed, slow_after))
+        labels = {"api": api, "method": method, "endpoint": endpoint_template(path), "outcome": outcome}
+        metrics.inc("panel_requests_total", labels, help_text="Panel API requests by endpoint and outcome (status class, timeout or exception type)")
+        metrics.observe("panel_request_duration_seconds", labels, elapsed, help_text="Panel API request latency")
+
+async def _panel_request(api: str, method: str, path: str, headers: Dict[str, str], json_payload: dict = None, params: dict = None, timeout: int = 30, retry: Optional[bool] = None, body: Any = None) -> Tuple[int, Optional[dict], str]:
+    # api is "app" (/api/application) or "client" (/api/client). Retries 429/5xx/network
+    # failures with capped exponential backoff; retry=None means "only if idempotent".
+    if retry is None:
+        retry = method.upper() in IDEMPOTENT_METHODS
+    deadline = _command_deadline.get()
+    endpoint = endpoint_template(path)
+    # calls given a longer timeout (server creation) are expected to be slow
+    slow_after = BREAKER_SLOW_SECONDS if timeout <= 30 else None
+    attempt = 0
+    while True:
+        attempt += 1
+        attempt_timeout = float(timeout)
+        if deadline is not None:
+            attempt_timeout = max(1.0, min(attempt_timeout, deadline - time.monotonic()))
+        status, js, text, retry_after, transient = await _panel_attempt(api, method, path, headers, json_payload, params, attempt_timeout, body, slow_after)
+        if not retry or not (status in RETRY_STATUSES or transient):
+            return status, js, text
+        if retry_after is not None:
+            delay = retry_after
+        else:
+            delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+        if attempt >= RETRY_MAX_ATTEMPTS or delay > RETRY_MAX_DELAY or (deadline is not None and time.monotonic() + delay >= deadline):
+            metrics.inc("panel_retry_exhausted_total", {"api": api, "endpoint": endpoint, "command": _current_command.get() or "-"},
+                        help_text="Panel requests that still failed when their retry budget ran out")
+            return status, js, text
+        metrics.inc("panel_retries_total", {"api": api, "method": method, "endpoint": endpoint, "reason": str(status) if status else "network"},
+                    help_text="Panel request retries by reason")
+        await asyncio.sleep(delay)
+
+async def request_app(method: str, path: str, json_payload: dict = None, params: dict = None, timeout: int = 30, retry: Optional[bool] = None) -> Tuple[int, Optional[dict], str]:
+    return await _panel_request("app", method, path, APP_HEADERS, json_payload=json_payload, params=params, timeout=timeout, retry=retry)
+
+async def iter_app_list(path: str, params: dict = None, per_page: int = None, prefetch: int = None, strict: bool = False) -> AsyncIterator[Dict[str, Any]]:
+    # yields the attributes of every item of a paginated list endpoint, in order,
+    # following meta.pagination; up to `prefetch` later pages are in flight while
+    # the caller consumes the current one, and are cancelled if it stops early.
+    # A failed page ends the listing, or raises PanelError when strict=True.
+    query = dict(params or {})
+    query["per_page"] = per_page or PANEL_PAGE_SIZE
+    prefetch = max(1, prefetch or PANEL_PAGE_PREFETCH)
+
+    status, js, text = await request_app("GET", path, params={**query, "page": 1})
+    if status != 200 or not js:
+        if strict:
+            raise PanelError(f"GET {path} failed ({status}): {text[:200]}")
+        return
+    total_pages = int(js.get("meta", {}).get("pagination", {}).get("total_pages", 1) or 1)
+    pending: deque = deque()
+    next_page = 2
+    try:
+        while True:
+            while next_page <= total_pages and len(pending) < prefetch:
+                pending.append(asyncio.ensure_future(request_app("GET", path, params={**query, "page": next_page})))
+                next_page += 1
+            for item in js.get("data", []):
+                yield item.get("attributes", {})
+            if not pending:
+                return
+            status, js, text = await pending.popleft()
+            if status != 200 or not js:
+                if strict:
+                    raise PanelError(f"GET {path} failed ({status}): {text[:200]}")
+                return
+    finally:
+        for task in pending:
+            task.cancel()
+
+async def find_app_item(path: str, predicate: Callable[[Dict[str, Any]], bool], params: dict = None) -> Optional[Dict[str, Any]]:
+    # first matching item; stops paging as soon as it is found
+    items = iter_app_list(path, params=params)
+    try:
+        async for a in items:
+            if predicate(a):
+                return a
+    finally:
+        await items.aclose()
+    return None
+
+# =========================
+# Background tasks
+# =========================
+_background_tasks: Dict[str, asyncio.Task] = {}
+
+def start_background_task(name: str, factory: Callable[[], Any]) -> None:
+    # on_ready fires again after reconnects; only start what isn't running.
+    # The task gets an empty context: started from a command (*console, *drop)
+    # it would otherwise keep that command's deadline and priority for its
+    # whole life, and later panel calls would get a 1s timeout and no retries.
+    task = _background_tasks.get(name)
+    if task is None or task.done():
+        _background_tasks[name] = contextvars.Context().run(asyncio.create_task, factory())
+
+async def stop_background_tasks() -> None:
+    tasks = list(_background_tasks.values())
+    _background_tasks.clear()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
 
 # =========================
 # EGG CATALOG and defaults
@@ -190,43 +973,308 @@ async def require_admin_ctx(ctx: commands.Context) -> bool:
     return True
 
 # =========================
-# Panel helpers: allocations / user lookup / server create/delete/list
+# Allocation pool: free allocations per node, handed out as leases
 # =========================
-async def get_free_allocation(node_id: int = PANEL_NODE_ID) -> Optional[int]:
-    status, js, text = await request_app("GET", f"/nodes/{node_id}/allocations")
-    if status != 200 or not js:
-        # fallback: if DEFAULT_ALLOCATION_ID is set
-        try:
-            return int(DEFAULT_ALLOCATION_ID) if DEFAULT_ALLOCATION_ID else None
-        except Exception:
+class AllocationPool:
+    def __init__(self, node_id: Any):
+        self.node_id = str(node_id)
+        self.free: deque = deque()            # unassigned, unreserved allocation ids
+        self.leases: Dict[int, float] = {}    # reserved allocation id -> lease expiry
+        self.confirmed: Dict[int, float] = {} # allocation id -> time it was confirmed assigned
+        self.total = 0
+        self.loaded_at: Optional[datetime.datetime] = None
+        self._refresh: Optional[asyncio.Future] = None
+
+    def _expire_leases(self) -> None:
+        # expired leases are not put back; the next refresh re-adds them if still unassigned
+        now = time.monotonic()
+        for alloc, expires in list(self.leases.items()):
+            if expires <= now:
+                del self.leases[alloc]
+
+    def reserve(self) -> Optional[int]:
+        self._expire_leases()
+        if not self.free:
             return None
-    for item in js.get("data", []):
-        attr = item.get("attributes", {})
-        if not attr.get("assigned", False):
-            # Attribute id commonly is attr['id'] (allocation record id)
-            try:
-                return int(attr.get("id"))
-            except Exception:
-                continue
+        alloc = self.free.popleft()
+        self.leases[alloc] = time.monotonic() + ALLOCATION_LEASE_SECONDS
+        return alloc
+
+    def release(self, alloc: int) -> None:
+        # server creation failed: hand the allocation out again
+        if self.leases.pop(alloc, None) is not None:
+            self.free.appendleft(alloc)
+
+    def confirm(self, alloc: int) -> None:
+        # server creation succeeded: the allocation is assigned now
+        self.leases.pop(alloc, None)
+        self.confirmed[alloc] = time.monotonic()
+
+    async def _load(self) -> bool:
+        started = time.monotonic()
+        free, total = [], 0
+        try:
+            async for a in iter_app_list(f"/nodes/{self.node_id}/allocations", strict=True):
+                total += 1
+                if not a.get("assigned", False) and str(a.get("id", "")).isdigit():
+                    free.append(int(a["id"]))
+        except PanelError as e:
+            print(f"⚠️ Allocation refresh for node {self.node_id} failed: {e}")
+            return False
+        self._expire_leases()
+        # anything confirmed while we were sweeping may still show as unassigned
+        recent = {a for a, at in self.confirmed.items() if at >= started}
+        self.confirmed = {a: self.confirmed[a] for a in recent}
+        self.free = deque(a for a in free if a not in self.leases and a not in recent)
+        self.total = total
+        self.loaded_at = datetime.datetime.utcnow()
+        return True
+
+    async def refresh(self) -> bool:
+        # concurrent callers share one sweep
+        if self._refresh is None or self._refresh.done():
+            self._refresh = asyncio.ensure_future(self._load())
+        return await asyncio.shield(self._refresh)
+
+allocation_pools: Dict[str, AllocationPool] = {}
+
+def allocation_pool(node_id: Any = PANEL_NODE_ID) -> AllocationPool:
+    key = str(node_id)
+    if key not in allocation_pools:
+        allocation_pools[key] = AllocationPool(key)
+    return allocation_pools[key]
+
+async def allocation_pool_loop() -> None:
+    allocation_pool(PANEL_NODE_ID)
+    while True:
+        for pool in list(allocation_pools.values()):
+            await pool.refresh()
+        await asyncio.sleep(ALLOCATION_REFRESH_INTERVAL)
+
+# =========================
+# Placement: pick a node for a new server
+# =========================
+class NodeCache:
+    def __init__(self):
+        self.nodes: Dict[str, Dict[str, Any]] = {}  # node id -> node attributes
+        self.loaded_at: Optional[float] = None
+        self._refresh: Optional[asyncio.Future] = None
+
+    async def _load(self) -> bool:
+        nodes = {}
+        try:
+            # servers are included only to sum their CPU limits; nodes have no CPU capacity of their own
+            async for a in iter_app_list("/nodes", params={"include": "servers"}, strict=True):
+                servers = a.pop("relationships", {}).get("servers", {}).get("data", [])
+                a.setdefault("allocated_resources", {})["cpu"] = sum(int(s.get("attributes", {}).get("limits", {}).get("cpu", 0) or 0) for s in servers)
+                a["server_count"] = len(servers)
+                nodes[str(a.get("id"))] = a
+        except PanelError as e:
+            print(f"⚠️ Node stats refresh failed: {e}")
+            return False
+        self.nodes = nodes
+        self.loaded_at = time.monotonic()
+        return True
+
+    async def refresh(self) -> bool:
+        if self._refresh is None or self._refresh.done():
+            self._refresh = asyncio.ensure_future(self._load())
+        return await asyncio.shield(self._refresh)
+
+    async def get(self) -> Dict[str, Dict[str, Any]]:
+        if self.loaded_at is None or time.monotonic() - self.loaded_at > NODE_STATS_TTL:
+            await self.refresh()
+        return self.nodes
+
+    def note_usage(self, node_id: str, memory: int, disk: int, cpu: int = 0) -> None:
+        # keep allocated_resources roughly current between refreshes
+        a = self.nodes.get(str(node_id))
+        if a is None:
+            return
+        used = a.setdefault("allocated_resources", {})
+        used["memory"] = int(used.get("memory", 0) or 0) + memory
+        used["disk"] = int(used.get("disk", 0) or 0) + disk
+        used["cpu"] = int(used.get("cpu", 0) or 0) + cpu
+        a["server_count"] = a.get("server_count", 0) + 1
+
+node_cache = NodeCache()
+
+async def node_stats_loop() -> None:
+    # one paginated /nodes sweep per interval; every node gets an allocation
+    # pool, which allocation_pool_loop keeps current from then on
+    while True:
+        if await node_cache.refresh():
+            cold = [allocation_pool(n) for n in node_cache.nodes if allocation_pool(n).loaded_at is None]
+            await asyncio.gather(*(p.refresh() for p in cold))
+        await asyncio.sleep(NODE_STATS_INTERVAL)
+
+def _node_capacity(a: Dict[str, Any], key: str) -> Tuple[Optional[int], int]:
+    # (capacity incl. overallocation or None if unlimited, currently allocated)
+    used = int(a.get("allocated_resources", {}).get(key, 0) or 0)
+    over = int(a.get(f"{key}_overallocate", 0) or 0)
+    if over < 0:
+        return None, used
+    return int(a.get(key, 0) or 0) * (100 + over) // 100, used
+
+# strategies score a candidate node; the highest score wins
+PLACEMENT_STRATEGIES: Dict[str, Callable[[Dict[str, Any]], float]] = {
+    # fill the fullest node that still fits, keeping others free for big servers
+    "bin_pack": lambda c: c["load_after"],
+    # keep server counts even by preferring nodes with the most free allocations
+    "spread": lambda c: c["free_allocations"],
+    # prefer the node with the most memory/disk headroom after placement
+    "least_loaded": lambda c: -c["load_after"],
+}
+
+def default_allocation() -> Optional[int]:
     try:
         return int(DEFAULT_ALLOCATION_ID) if DEFAULT_ALLOCATION_ID else None
     except Exception:
         return None
 
+async def place_server(memory: int, cpu: int, disk: int, node: Optional[Any] = None) -> Tuple[str, Optional[int]]:
+    # returns (node id, reserved allocation id); the allocation must be confirmed
+    # or released on that node's pool once the create call has finished
+    if node is not None:
+        alloc = await get_free_allocation(node)
+        print(f"📍 Placement {memory}MB/{cpu}%/{disk}MB -> node {node} (requested explicitly), allocation {alloc}")
+        return str(node), alloc
+
+    nodes = await node_cache.get()
+    if not nodes:
+        alloc = await get_free_allocation(PANEL_NODE_ID)
+        print(f"📍 Placement {memory}MB/{cpu}%/{disk}MB -> node {PANEL_NODE_ID} (no node stats, default node), allocation {alloc}")
+        return str(PANEL_NODE_ID), alloc
+
+    node_ids = [str(n) for n in PLACEMENT_NODE_IDS] or list(nodes)
+    cold = [allocation_pool(n) for n in node_ids if allocation_pool(n).loaded_at is None]
+    if cold:
+        await asyncio.gather(*(p.refresh() for p in cold))
+
+    strategy = PLACEMENT_STRATEGIES.get(PLACEMENT_STRATEGY, PLACEMENT_STRATEGIES["least_loaded"])
+    scored = []
+    for n in node_ids:
+        a = nodes.get(n)
+        if not a or a.get("maintenance_mode"):
+            continue
+        free_allocations = len(allocation_pool(n).free)
+        if not free_allocations:
+            continue
+        mem_cap, mem_used = _node_capacity(a, "memory")
+        disk_cap, disk_used = _node_capacity(a, "disk")
+        if (mem_cap is not None and mem_used + memory > mem_cap) or (disk_cap is not None and disk_used + disk > disk_cap):
+            continue
+        mem_load = (mem_used + memory) / mem_cap if mem_cap else 0.0
+        disk_load = (disk_used + disk) / disk_cap if disk_cap else 0.0
+        c = {"node": n, "free_allocations": free_allocations, "load_after": (mem_load + disk_load) / 2}
+        scored.append((strategy(c), c))
+    scored.sort(key=lambda sc: sc[0], reverse=True)
+
+    for score, c in scored:
+        alloc = allocation_pool(c["node"]).reserve()
+        if alloc is not None:
+            print(f"📍 Placement {memory}MB/{cpu}%/{disk}MB -> node {c['node']} ({PLACEMENT_STRATEGY}, score {score:.3f}, "
+                  f"load after {c['load_after']:.0%}, {c['free_allocations']} free allocations, {len(scored)} candidates), allocation {alloc}")
+            return c["node"], alloc
+
+    alloc = default_allocation()
+    print(f"📍 Placement {memory}MB/{cpu}%/{disk}MB -> no node fits ({len(node_ids)} checked), default allocation {alloc}")
+    return str(PANEL_NODE_ID), alloc
+
+# =========================
+# Panel user cache: email -> panel user id
+# =========================
+class UserEmailCache:
+    def __init__(self):
+        self.entries: Dict[str, Tuple[Optional[int], float]] = {}  # lowercased email -> (user id or None, expiry)
+        self.emails: Dict[int, str] = {}                           # user id -> lowercased email
+        self.loaded_at: Optional[float] = None
+        self._refresh: Optional[asyncio.Future] = None
+
+    def get(self, email: str) -> Tuple[bool, Optional[int]]:
+        # (hit, user id); a hit with None is a cached "no such user"
+        e = self.entries.get(email.lower())
+        if e is None or e[1] <= time.monotonic():
+            return False, None
+        return True, e[0]
+
+    def put(self, email: str, user_id: Optional[int]) -> None:
+        key = email.lower()
+        ttl = USER_CACHE_TTL if user_id is not None else USER_CACHE_NEGATIVE_TTL
+        self.entries[key] = (user_id, time.monotonic() + ttl)
+        if user_id is not None:
+            self.emails[user_id] = key
+
+    def invalidate(self, user_id: int) -> None:
+        key = self.emails.pop(user_id, None)
+        if key is not None:
+            self.entries.pop(key, None)
+
+    def stale(self) -> bool:
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > USER_CACHE_TTL
+
+    async def _load(self) -> bool:
+        users = []
+        try:
+            async for a in iter_app_list("/users", strict=True):
+                if a.get("email") and a.get("id") is not None:
+                    users.append((a["email"], int(a["id"])))
+        except PanelError as e:
+            print(f"⚠️ Panel user cache refresh failed: {e}")
+            return False
+        self.entries, self.emails = {}, {}
+        for addr, user_id in users:
+            self.put(addr, user_id)
+        self.loaded_at = time.monotonic()
+        return True
+
+    async def refresh(self) -> bool:
+        if self._refresh is None or self._refresh.done():
+            self._refresh = asyncio.ensure_future(self._load())
+        return await asyncio.shield(self._refresh)
+
+user_cache = UserEmailCache()
+
+# =========================
+# Panel helpers: allocations / user lookup / server create/delete/list
+# =========================
+async def get_free_allocation(node_id: int = PANEL_NODE_ID) -> Optional[int]:
+    # reserves an allocation from the node's pool; the caller must confirm or
+    # release it once the server create call has finished
+    pool = allocation_pool(node_id)
+    alloc = pool.reserve()
+    if alloc is None:
+        await pool.refresh()
+        alloc = pool.reserve()
+    if alloc is not None:
+        return alloc
+    # fallback: if DEFAULT_ALLOCATION_ID is set
+    return default_allocation()
+
 async def find_panel_user_by_email(email: str) -> Optional[int]:
-    # try filter param first
+    hit, uid = user_cache.get(email)
+    if hit:
+        return uid
+    # one paginated sweep fills the whole index
+    if user_cache.stale() and await user_cache.refresh():
+        hit, uid = user_cache.get(email)
+        if hit:
+            return uid
+    # users created since the last sweep: filter param
     status, js, text = await request_app("GET", "/users", params={"filter[email]": email})
-    if status == 200 and js:
-        if js.get("data"):
-            return int(js["data"][0]["attributes"]["id"])
-    # fallback: list all and match email
-    status, js, text = await request_app("GET", "/users")
-    if status == 200 and js:
-        for u in js.get("data", []):
-            a = u.get("attributes", {})
-            if a.get("email", "").lower() == email.lower():
-                return int(a.get("id"))
-    return None
+    if status != 200 or js is None:
+        return None
+    # filter[email] is a partial match (bob@x.com also finds jimbob@x.com)
+    uid = None
+    for item in js.get("data", []):
+        a = item.get("attributes", {})
+        if a.get("email") and a.get("id") is not None:
+            user_cache.put(a["email"], int(a["id"]))
+            if a["email"].lower() == email.lower():
+                uid = int(a["id"])
+    if uid is None:
+        user_cache.put(email, None)
+    return uid
 
 async def create_panel_user(email: str, username: str, password: Optional[str] = None, first_name: str = "Discord", last_name: str = "User") -> Optional[int]:
     payload = {"email": email, "username": username, "first_name": first_name, "last_name": last_name}
@@ -235,7 +1283,9 @@ async def create_panel_user(email: str, username: str, password: Optional[str] =
     status, js, text = await request_app("POST", "/users", json_payload=payload)
     if status in (200, 201) and js:
         try:
-            return int(js.get("attributes", {}).get("id"))
+            uid = int(js.get("attributes", {}).get("id"))
+            user_cache.put(email, uid)
+            return uid
         except Exception:
             pass
     # if failed due to exists, try lookup
@@ -246,15 +1296,22 @@ async def create_panel_user(email: str, username: str, password: Optional[str] =
 
 async def delete_panel_user(panel_user_id: int) -> bool:
     status, js, text = await request_app("DELETE", f"/users/{panel_user_id}")
-    return status in (200, 204)
+    if status in (200, 204):
+        user_cache.invalidate(int(panel_user_id))
+        return True
+    return False
 
-async def create_server_app(name: str, owner_panel_id: int, egg_key: str, memory: int, cpu: int, disk: int, allocation_id: Optional[int] = None) -> Tuple[bool, str]:
+async def create_server_app(name: str, owner_panel_id: int, egg_key: str, memory: int, cpu: int, disk: int, allocation_id: Optional[int] = None, node: Optional[Any] = None, external_id: Optional[str] = None) -> Tuple[bool, str]:
     if egg_key not in EGG_CATALOG:
         return False, "Unknown egg key."
     egg_def = EGG_CATALOG[egg_key]
-    alloc = allocation_id or await get_free_allocation()
+    if allocation_id:
+        node_id, alloc = str(node or PANEL_NODE_ID), allocation_id
+    else:
+        node_id, alloc = await place_server(memory, cpu, disk, node=node)
     if not alloc:
         return False, "No free allocation available and no DEFAULT_ALLOCATION_ID set."
+    pool = allocation_pool(node_id)
 
     payload = {
         "name": name,
@@ -268,40 +1325,163 @@ async def create_server_app(name: str, owner_panel_id: int, egg_key: str, memory
         "allocation": {"default": alloc},
         "environment": build_env_for_egg(egg_key)
     }
+    if external_id:
+        payload["external_id"] = external_id  # unique on the panel; a second create with it is rejected
 
     status, js, text = await request_app("POST", "/servers", json_payload=payload, timeout=60)
     if status in (200, 201) and js:
+        pool.confirm(alloc)
+        node_cache.note_usage(node_id, memory, disk, cpu)
+        if js.get("attributes", {}).get("id") is not None:
+            server_index.add(js["attributes"])
         ident = js.get("attributes", {}).get("identifier", js.get("attributes", {}).get("id", "unknown"))
         return True, f"✅ Server creation queued. Identifier: `{ident}`"
+    pool.release(alloc)
     return False, f"❌ Panel error {status}: {text}"
 
 async def delete_server_app(server_id: int) -> Tuple[bool, str]:
     status, js, text = await request_app("DELETE", f"/servers/{server_id}")
     if status in (200, 204):
+        server_index.remove(server_id)
         return True, "✅ Server deleted."
     return False, f"❌ Panel error {status}: {text}"
 
+async def set_server_suspended(server_id: Any, suspended: bool) -> Tuple[int, str]:
+    action = "suspend" if suspended else "unsuspend"
+    status, js, text = await request_app("POST", f"/servers/{server_id}/{action}", retry=True)
+    if status == 204:
+        server_index.set_suspended(server_id, suspended)
+    return status, text
+
 async def list_servers_app() -> List[Dict[str, Any]]:
-    status, js, text = await request_app("GET", "/servers")
     out = []
-    if status != 200 or not js:
-        return out
-    for d in js.get("data", []):
-        a = d.get("attributes", {})
+    async for a in iter_app_list("/servers"):
         out.append({"id": a.get("id"), "name": a.get("name"), "identifier": a.get("identifier"), "limits": a.get("limits", {})})
     return out
 
-async def node_stats(node_id: int = PANEL_NODE_ID) -> Tuple[int, int]:
-    free = 0
-    total = 0
-    status, js, text = await request_app("GET", f"/nodes/{node_id}/allocations")
-    if status != 200 or not js:
-        return 0, 0
-    for item in js.get("data", []):
-        total += 1
-        if not item.get("attributes", {}).get("assigned", False):
-            free += 1
-    return free, total
+def node_stats_text(node_id: str, a: Dict[str, Any]) -> str:
+    # rendered from the background poller's snapshot; never calls the panel
+    def usage(key: str) -> str:
+        cap, used = _node_capacity(a, key)
+        if cap is None:
+            return f"{used}MB used (unlimited)"
+        return f"{used}/{cap}MB ({used * 100 // cap if cap else 0}%), {max(cap - used, 0)}MB free"
+    pool = allocation_pool(node_id)
+    if pool.loaded_at is None:
+        allocations = "loading..."
+    else:
+        allocations = f"{len(pool.free)} free / {pool.total} total"
+    flags = " 🛠 maintenance" if a.get("maintenance_mode") else ""
+    return (f"🖥 Node `{node_id}` **{a.get('name', '?')}**{flags}\n"
+            f"RAM: {usage('memory')}\n"
+            f"Disk: {usage('disk')}\n"
+            f"CPU: {a.get('allocated_resources', {}).get('cpu', 0)}% allocated to {a.get('server_count', 0)} servers\n"
+            f"Allocations: {allocations}")
+
+# =========================
+# Server index: identifier <-> internal id <-> owner
+# =========================
+def _server_entry(a: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": int(a["id"]),
+        "identifier": a.get("identifier"),
+        "owner": a.get("user"),
+        "name": a.get("name"),
+        "node": a.get("node"),
+        "egg": a.get("egg"),
+        "limits": a.get("limits", {}),
+        "suspended": bool(a.get("suspended")) or a.get("status") == "suspended",
+        "updated_at": a.get("updated_at"),
+    }
+
+class ServerIndex:
+    def __init__(self):
+        self.by_identifier: Dict[str, Dict[str, Any]] = {}
+        self.by_id: Dict[int, Dict[str, Any]] = {}
+        self.by_owner: Dict[Any, Dict[int, Dict[str, Any]]] = {}
+        self.loaded_at: Optional[datetime.datetime] = None
+        # changes made while a full refresh is sweeping; replayed on top of it
+        self._changes: Optional[Dict[int, Optional[Dict[str, Any]]]] = None
+        self._refresh: Optional[asyncio.Future] = None
+
+    def _put(self, e: Dict[str, Any]) -> None:
+        self._drop(e["id"])
+        self.by_id[e["id"]] = e
+        if e["identifier"]:
+            self.by_identifier[e["identifier"]] = e
+        self.by_owner.setdefault(e["owner"], {})[e["id"]] = e
+
+    def _drop(self, server_id: int) -> None:
+        e = self.by_id.pop(server_id, None)
+        if not e:
+            return
+        self.by_identifier.pop(e["identifier"], None)
+        owned = self.by_owner.get(e["owner"], {})
+        owned.pop(server_id, None)
+        if not owned:
+            self.by_owner.pop(e["owner"], None)
+
+    def add(self, attrs: Dict[str, Any]) -> None:
+        e = _server_entry(attrs)
+        self._put(e)
+        if self._changes is not None:
+            self._changes[e["id"]] = e
+
+    def remove(self, server_id: int) -> None:
+        self._drop(int(server_id))
+        if self._changes is not None:
+            self._changes[int(server_id)] = None
+
+    def get(self, identifier: str) -> Optional[Dict[str, Any]]:
+        e = self.by_identifier.get(identifier)
+        metrics.inc("server_index_lookups_total", {"result": "hit" if e else "miss"}, help_text="Server index lookups by identifier")
+        return e
+
+    def servers_of(self, owner_panel_id: Any) -> List[Dict[str, Any]]:
+        return list(self.by_owner.get(owner_panel_id, {}).values())
+
+    def set_suspended(self, server_id: int, suspended: bool) -> None:
+        e = self.by_id.get(int(server_id))
+        if not e:
+            return
+        e["suspended"] = suspended
+        if self._changes is not None:
+            self._changes[e["id"]] = e
+
+    async def _load(self) -> bool:
+        self._changes = {}
+        fresh = []
+        try:
+            async for a in iter_app_list("/servers", strict=True):
+                fresh.append(_server_entry(a))
+        except PanelError as e:
+            print(f"⚠️ Server index refresh failed: {e}")
+            return False
+        finally:
+            changes, self._changes = self._changes, None
+        self.by_identifier, self.by_id, self.by_owner = {}, {}, {}
+        for e in fresh:
+            self._put(e)
+        for server_id, e in changes.items():
+            if e is None:
+                self._drop(server_id)
+            else:
+                self._put(e)
+        self.loaded_at = datetime.datetime.utcnow()
+        return True
+
+    async def refresh(self) -> bool:
+        # callers arriving during a sweep wait for that sweep instead of starting another
+        if self._refresh is None or self._refresh.done():
+            self._refresh = asyncio.ensure_future(self._load())
+        return await asyncio.shield(self._refresh)
+
+server_index = ServerIndex()
+
+async def server_index_loop() -> None:
+    while True:
+        await server_index.refresh()
+        await asyncio.sleep(SERVER_INDEX_TTL)
 
 # =========================
 # Client (user) API helpers for manage
@@ -309,39 +1489,531 @@ async def node_stats(node_id: int = PANEL_NODE_ID) -> Tuple[int, int]:
 def client_headers(client_key: str) -> Dict[str, str]:
     return {"Authorization": f"Bearer {client_key}", "Content-Type": "application/json", "Accept": "application/json"}
 
+async def request_client(client_key: str, method: str, path: str, json_payload: dict = None, params: dict = None, timeout: int = 30, retry: Optional[bool] = None, body: Optional[str] = None) -> Tuple[int, Optional[dict], str]:
+    # path is relative to /api/client and is empty or starts with '/'; body is sent as raw text (file writes)
+    headers = client_headers(client_key)
+    if body is not None:
+        headers["Content-Type"] = "text/plain"
+    return await _panel_request("client", method, path, headers, json_payload=json_payload, params=params, timeout=timeout, retry=retry, body=body)
+
+# The servers a client key can reach (owned or shared with it as a subuser),
+# from GET /api/client. Identifiers are checked against this list before any
+# per-server call, so typos and servers the key cannot reach are answered
+# without a round trip, and short forms (a unique identifier prefix or the
+# server's name) are resolved to the identifier.
+class ClientServerCache:
+    def __init__(self):
+        self.entries: Dict[str, Tuple[Dict[str, Dict[str, Any]], float]] = {}  # client key -> (identifier -> server, loaded at)
+        self._loads: Dict[str, asyncio.Future] = {}
+
+    async def _load(self, client_key: str) -> Tuple[Optional[Dict[str, Dict[str, Any]]], str]:
+        servers: Dict[str, Dict[str, Any]] = {}
+        page, total_pages = 1, 1
+        while page <= total_pages:
+            status, js, text = await request_client(client_key, "GET", "", params={"page": page, "per_page": PANEL_PAGE_SIZE})
+            if status in (401, 403):
+                return None, f"❌ The panel rejected your client API key ({status}); link a new one with `{PREFIX}manage key <client_api_key>`."
+            if status != 200 or not js:
+                return None, f"❌ Could not list your servers ({status}): {text[:200]}"
+            for item in js.get("data", []):
+                a = item.get("attributes", {})
+                if a.get("identifier"):
+                    servers[a["identifier"]] = {
+                        "identifier": a["identifier"],
+                        "uuid": (a.get("uuid") or "").lower(),
+                        "name": a.get("name") or a["identifier"],
+                        "owner": bool(a.get("server_owner", True)),
+                        "suspended": bool(a.get("is_suspended")) or a.get("status") == "suspended",
+                    }
+            total_pages = int(js.get("meta", {}).get("pagination", {}).get("total_pages", 1) or 1)
+            page += 1
+        self.entries[client_key] = (servers, time.monotonic())
+        return servers, ""
+
+    async def servers(self, client_key: str, max_age: float = CLIENT_SERVERS_TTL) -> Tuple[Optional[Dict[str, Dict[str, Any]]], str]:
+        # identifier -> server for this key, or (None, reason); concurrent callers share one fetch
+        e = self.entries.get(client_key)
+        fresh = e is not None and time.monotonic() - e[1] <= max_age
+        metrics.inc("client_server_cache_lookups_total", {"result": "hit" if fresh else "miss"}, help_text="Client key server list lookups")
+        if fresh:
+            return e[0], ""
+        load = self._loads.get(client_key)
+        if load is None or load.done():
+            load = self._loads[client_key] = asyncio.ensure_future(self._load(client_key))
+        return await asyncio.shield(load)
+
+    def forget(self, client_key: str) -> None:
+        self.entries.pop(client_key, None)
+        self._loads.pop(client_key, None)
+
+    @staticmethod
+    def _match(servers: Dict[str, Dict[str, Any]], text: str) -> Optional[str]:
+        if text in servers:
+            return text
+        needle = text.lower()
+        # the full UUID, as the commands accepted before the lookups went through this cache
+        for found in ([i for i, s in servers.items() if s["uuid"] == needle],
+                      [i for i in servers if i.startswith(needle)],
+                      [i for i, s in servers.items() if s["name"].lower() == needle]):
+            if len(found) == 1:
+                return found[0]
+        return None
+
+    @staticmethod
+    def suggest(servers: Dict[str, Dict[str, Any]], text: str, n: int = 3) -> List[str]:
+        # identifiers whose identifier or name looks like `text`, best first
+        needle = text.lower()
+        names = {s["name"].lower(): i for i, s in servers.items()}
+        close = difflib.get_close_matches(needle, list(servers) + list(names), n=n * 2, cutoff=0.5)
+        starts = [i for i in servers if i.startswith(needle)] + [i for name, i in names.items() if name.startswith(needle)]
+        out: List[str] = []
+        for c in starts + close:
+            i = names.get(c, c) if c not in servers else c
+            if i not in out:
+                out.append(i)
+        return out[:n]
+
+    async def resolve(self, client_key: str, text: str) -> Tuple[Optional[str], str]:
+        # the identifier `text` names for this key, or (None, message for the user)
+        servers, err = await self.servers(client_key)
+        if servers is None:
+            return None, err
+        found = self._match(servers, text)
+        if found is None and time.monotonic() - self.entries[client_key][1] > CLIENT_SERVERS_RECHECK:
+            # created or shared since the last fetch?
+            servers, err = await self.servers(client_key, CLIENT_SERVERS_RECHECK)
+            if servers is None:
+                return None, err
+            found = self._match(servers, text)
+        if found is not None:
+            return found, ""
+        hints = self.suggest(servers, text)
+        if hints:
+            listed = ", ".join(f"`{i}` ({servers[i]['name']})" for i in hints)
+            return None, f"❌ No server `{text}` on your account. Did you mean {listed}?"
+        return None, f"❌ No server `{text}` on your account. See `{PREFIX}manage list`."
+
+client_servers = ClientServerCache()
+
 async def client_power(client_key: str, identifier: str, signal: str) -> Tuple[bool, str]:
-    url = f"{PANEL_URL}/api/client/servers/{identifier}/power"
-    async with aiohttp.ClientSession() as s:
-        async with s.post(url, headers=client_headers(client_key), json={"signal": signal}) as r:
-            text = await r.text()
-            if r.status in (200, 204):
-                return True, f"✅ Power `{signal}` sent."
-            return False, f"❌ Client error {r.status}: {text}"
+    status, js, text = await request_client(client_key, "POST", f"/servers/{identifier}/power", json_payload={"signal": signal})
+    if status in (200, 204):
+        return True, f"✅ Power `{signal}` sent."
+    return False, f"❌ Client error {status}: {text}"
 
 async def client_reinstall(client_key: str, identifier: str) -> Tuple[bool, str]:
-    url = f"{PANEL_URL}/api/client/servers/{identifier}/reinstall"
-    async with aiohttp.ClientSession() as s:
-        async with s.post(url, headers=client_headers(client_key)) as r:
-            text = await r.text()
-            if r.status in (200, 202, 204):
-                return True, "✅ Reinstall queued."
-            return False, f"❌ Client error {r.status}: {text}"
+    status, js, text = await request_client(client_key, "POST", f"/servers/{identifier}/reinstall")
+    if status in (200, 202, 204):
+        return True, "✅ Reinstall queued."
+    return False, f"❌ Client error {status}: {text}"
 
 async def client_info(client_key: str, identifier: str) -> Tuple[bool, str]:
-    url = f"{PANEL_URL}/api/client/servers/{identifier}"
-    async with aiohttp.ClientSession() as s:
-        async with s.get(url, headers=client_headers(client_key)) as r:
-            text = await r.text()
-            if r.status != 200:
-                return False, f"❌ Client error {r.status}: {text}"
-            js = await r.json()
-            a = js.get("attributes", {})
-            sftp = a.get("relationships", {}).get("allocations", {}) if isinstance(a.get("relationships", {}), dict) else {}
-            # best-effort extract
-            sftp_details = a.get("sftp_details", {})
-            ip = sftp_details.get("ip", "n/a")
-            port = sftp_details.get("port", "n/a")
-            return True, f"🧩 Name: **{a.get('name')}**\nID: `{a.get('identifier')}`\nSFTP: `{ip}:{port}`\nStatus: {a.get('status','n/a')}"
+    status, js, text = await request_client(client_key, "GET", f"/servers/{identifier}")
+    if status != 200 or not js:
+        return False, f"❌ Client error {status}: {text}"
+    a = js.get("attributes", {})
+    # best-effort extract
+    sftp_details = a.get("sftp_details", {})
+    ip = sftp_details.get("ip", "n/a")
+    port = sftp_details.get("port", "n/a")
+    return True, f"🧩 Name: **{a.get('name')}**\nID: `{a.get('identifier')}`\nSFTP: `{ip}:{port}`\nStatus: {a.get('status','n/a')}"
+
+async def client_list_files(client_key: str, identifier: str, directory: str) -> Tuple[Optional[List[Dict[str, Any]]], str]:
+    status, js, text = await request_client(client_key, "GET", f"/servers/{identifier}/files/list", params={"directory": directory})
+    if status != 200 or js is None:
+        return None, f"❌ Client error {status}: {text[:300]}"
+    return [f.get("attributes", {}) for f in js.get("data", [])], ""
+
+async def client_read_file(client_key: str, identifier: str, path: str, max_bytes: int) -> Tuple[Optional[str], str]:
+    # the size is checked in the directory listing first so big files are never pulled through the API
+    files, err = await client_list_files(client_key, identifier, posixpath.dirname(path) or "/")
+    if files is None:
+        return None, err
+    entry = next((f for f in files if f.get("name") == posixpath.basename(path)), None)
+    if entry is None or not entry.get("is_file", True):
+        return None, f"❌ `{path}` is not a file."
+    if int(entry.get("size", 0) or 0) > max_bytes:
+        return None, f"❌ `{path}` is larger than {max_bytes} bytes; use Download instead."
+    status, js, text = await request_client(client_key, "GET", f"/servers/{identifier}/files/contents", params={"file": path})
+    if status != 200:
+        return None, f"❌ Client error {status}: {text[:300]}"
+    return text, ""
+
+async def client_write_file(client_key: str, identifier: str, path: str, content: str) -> Tuple[bool, str]:
+    status, js, text = await request_client(client_key, "POST", f"/servers/{identifier}/files/write", params={"file": path}, body=content)
+    if status == 204:
+        return True, f"✅ Saved `{path}`."
+    return False, f"❌ Client error {status}: {text[:300]}"
+
+async def client_delete_file(client_key: str, identifier: str, path: str) -> Tuple[bool, str]:
+    payload = {"root": posixpath.dirname(path) or "/", "files": [posixpath.basename(path)]}
+    status, js, text = await request_client(client_key, "POST", f"/servers/{identifier}/files/delete", json_payload=payload)
+    if status == 204:
+        return True, f"🗑️ Deleted `{path}`."
+    return False, f"❌ Client error {status}: {text[:300]}"
+
+async def client_command(client_key: str, identifier: str, command: str) -> Tuple[bool, str]:
+    status, js, text = await request_client(client_key, "POST", f"/servers/{identifier}/command", json_payload={"command": command})
+    if status == 204:
+        return True, f"💻 Sent `{command}`."
+    if status == 502:
+        return False, "❌ The server is offline."
+    return False, f"❌ Client error {status}: {text[:300]}"
+
+async def client_backup(client_key: str, identifier: str) -> Tuple[bool, str]:
+    status, js, text = await request_client(client_key, "POST", f"/servers/{identifier}/backups")
+    if status == 200 and js:
+        a = js.get("attributes", {})
+        return True, f"💾 Backup **{a.get('name', '?')}** started (`{a.get('uuid', '?')}`)."
+    return False, f"❌ Client error {status}: {text[:300]}"
+
+async def client_signed_url(client_key: str, identifier: str, kind: str, params: dict = None) -> Tuple[Optional[str], str]:
+    # kind is "download" (params {"file": path}) or "upload"; the URL points at the node and expires after a while
+    status, js, text = await request_client(client_key, "GET", f"/servers/{identifier}/files/{kind}", params=params)
+    url = (js or {}).get("attributes", {}).get("url")
+    if status != 200 or not url:
+        return None, f"❌ Client error {status}: {text[:300]}"
+    return url, ""
+
+def _transfer_timeout() -> aiohttp.ClientTimeout:
+    return aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=FILE_TRANSFER_IDLE_TIMEOUT)
+
+async def stream_upload(source_url: str, upload_url: str, filename: str, directory: str) -> Tuple[bool, str]:
+    # Discord attachment -> node, chunk by chunk; the file is never held in memory whole
+    session = get_stream_session()
+    async with session.get(source_url, timeout=_transfer_timeout()) as src:
+        if src.status != 200:
+            return False, f"❌ Could not read the attachment ({src.status})."
+        with aiohttp.MultipartWriter("form-data") as form:
+            part = form.append(src.content.iter_chunked(FILE_CHUNK_SIZE))
+            part.set_content_disposition("form-data", name="files", filename=filename)
+        async with session.post(upload_url, params={"directory": directory}, data=form, timeout=_transfer_timeout()) as resp:
+            if resp.status in (200, 204):
+                return True, f"📤 Uploaded `{filename}` to `{directory}`."
+            return False, f"❌ Upload failed ({resp.status}): {(await resp.text())[:300]}"
+
+async def stream_download(download_url: str, filename: str) -> Tuple[Optional[discord.File], str]:
+    # node -> temp file -> Discord attachment; too big for Discord means the link is sent instead
+    too_big = f"📦 `{filename}` is too large to attach; download it here (the link expires soon): {download_url}"
+    spool = tempfile.TemporaryFile()
+    try:
+        async with get_stream_session().get(download_url, timeout=_transfer_timeout()) as resp:
+            if resp.status != 200:
+                spool.close()
+                return None, f"❌ Download failed ({resp.status})."
+            if (resp.content_length or 0) > FILE_MAX_ATTACHMENT:
+                spool.close()
+                return None, too_big
+            size = 0
+            async for chunk in resp.content.iter_chunked(FILE_CHUNK_SIZE):
+                size += len(chunk)
+                if size > FILE_MAX_ATTACHMENT:
+                    spool.close()
+                    return None, too_big
+                spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return discord.File(spool, filename=filename), ""
+
+# =========================
+# Server creation jobs
+# =========================
+# *create and *sendserver only record a job and answer with its id; a small
+# worker pool makes the panel calls and edits that answer once the job ends.
+# Jobs are kept in data["server_jobs"], so queued and interrupted jobs are
+# picked up again after a restart. Each job's server is created with the job's
+# external_id, which is how an interrupted job finds out whether the panel
+# already has it. Secrets (the *sendserver password) stay in memory only and
+# are lost on a restart.
+_job_queue: Optional[asyncio.Queue] = None
+_running_jobs: set = set()
+_job_secrets: Dict[str, Dict[str, Any]] = {}  # job id -> values never written to disk
+
+def server_jobs() -> Dict[str, Dict[str, Any]]:
+    return data.setdefault("server_jobs", {})
+
+def job_queue() -> asyncio.Queue:
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = asyncio.Queue()
+    return _job_queue
+
+def active_job_for(owner_id: str) -> Optional[str]:
+    for job_id, job in server_jobs().items():
+        if job["owner"] == owner_id and job["status"] in ("queued", "running"):
+            return job_id
+    return None
+
+def prune_server_jobs() -> None:
+    jobs = server_jobs()
+    cutoff = time.time() - SERVER_JOB_RETENTION
+    stale = [job_id for job_id, job in jobs.items() if job.get("finished") and job["finished"] < cutoff]
+    for job_id in stale:
+        del jobs[job_id]
+    if stale:
+        mark_dirty("server_jobs")
+
+async def submit_server_job(ctx: commands.Context, kind: str, owner_id: str, server: Dict[str, Any], secrets: Optional[Dict[str, Any]] = None, **extra: Any) -> None:
+    # one active job per owner; asking again just points at the existing one
+    existing = active_job_for(owner_id)
+    if existing:
+        await ctx.reply(f"⏳ A server for that user is already being created: job `{existing}` — `{PREFIX}job {existing}`")
+        return
+    prune_server_jobs()
+    jobs = server_jobs()
+    job_id = f"{random.getrandbits(24):06x}"
+    while job_id in jobs:
+        job_id = f"{random.getrandbits(24):06x}"
+    created = time.time()
+    job = jobs[job_id] = {
+        "kind": kind,
+        "owner": owner_id,
+        "requester": str(ctx.author.id),
+        "priority": _command_priority.get(),
+        "server": server,
+        "status": "queued",
+        "result": "",
+        "created": created,
+        "external_id": f"discord-job-{job_id}-{int(created)}",
+        "finished": None,
+        "channel_id": None,
+        "message_id": None,
+        **extra,
+    }
+    if secrets:
+        _job_secrets[job_id] = secrets
+    try:
+        reply = await ctx.reply(f"🕒 Server job `{job_id}` queued ({queued_ahead(job_id)} ahead). Check it with `{PREFIX}job {job_id}`; this message is updated when it finishes.")
+        job["channel_id"], job["message_id"] = reply.channel.id, reply.id
+    finally:
+        await save_data("server_jobs", durable=True)
+        job_queue().put_nowait(job_id)
+
+def queued_ahead(job_id: str) -> int:
+    job = server_jobs()[job_id]
+    return sum(1 for other_id, other in server_jobs().items()
+               if other_id != job_id and other["status"] == "queued" and other["created"] <= job["created"])
+
+async def edit_status_message(record: Dict[str, Any], text: str) -> None:
+    # record holds channel_id/message_id of a reply the bot keeps up to date
+    if not record.get("message_id"):
+        return
+    try:
+        channel = bot.get_channel(record["channel_id"]) or await bot.fetch_channel(record["channel_id"])
+        await channel.get_partial_message(record["message_id"]).edit(content=text)
+    except Exception as e:
+        print(f"⚠️ Could not update status message {record['message_id']}: {e}")
+
+async def run_server_job(job_id: str) -> None:
+    job = server_jobs().get(job_id)
+    if not job or job["status"] not in ("queued", "running"):
+        return
+    _command_priority.set(job.get("priority", 1))
+    _command_deadline.set(time.monotonic() + COMMAND_DEADLINE)
+    server = job["server"]
+    interrupted = job["status"] == "running"
+    job["status"] = "running"
+    await save_data("server_jobs")
+
+    external_id = job.setdefault("external_id", f"discord-job-{job_id}-{int(job['created'])}")
+    found = None
+    if interrupted:
+        # the bot stopped while this job was in flight; the panel may already have the server
+        status, js, text = await request_app("GET", f"/servers/external/{external_id}")
+        if status == 200 and js:
+            found = js.get("attributes", {})
+    if found:
+        ok, msg = True, f"✅ Server created. Identifier: `{found.get('identifier')}`"
+    else:
+        ok, msg = await create_server_app(**server, external_id=external_id)
+
+    if ok and job["kind"] == "create":
+        data.setdefault("user_servers", {})[job["owner"]] = {
+            "name": server["name"],
+            "ram": server["memory"],
+            "cpu": server["cpu"],
+            "disk": server["disk"],
+            "egg": server["egg_key"]
+        }
+        await save_data("user_servers")
+    elif ok and job["kind"] == "send":
+        try:
+            password = _job_secrets.get(job_id, {}).get("password")
+            user = bot.get_user(int(job["owner"])) or await bot.fetch_user(int(job["owner"]))
+            await user.send(
+                f"🎉 Your server has been created!\n"
+                f"🔗 Panel: {PANEL_URL}\n"
+                f"📧 Email: `{job['email']}`\n"
+                + (f"🔑 Password: `{password}`\n" if password else "🔑 Password: ask the admin who set up your account\n") +
+                f"💾 Specs: {server['memory']}MB RAM | {server['cpu']}% CPU | {server['disk']}MB Disk"
+            )
+            msg = f"✅ Server created and info sent to <@{job['owner']}>"
+        except Exception:
+            msg = "⚠️ Server created, but could not DM user, maybe DMs are off."
+    _job_secrets.pop(job_id, None)
+    await finish_server_job(job, ok, msg)
+
+async def finish_server_job(job: Dict[str, Any], ok: bool, msg: str) -> None:
+    job["status"] = "done" if ok else "failed"
+    job["result"] = msg
+    job["finished"] = time.time()
+    await save_data("server_jobs", durable=True)
+    await edit_status_message(job, msg)
+
+async def server_job_worker() -> None:
+    queue = job_queue()
+    while True:
+        job_id = await queue.get()
+        if job_id in _running_jobs:
+            queue.task_done()
+            continue
+        _running_jobs.add(job_id)
+        try:
+            await run_server_job(job_id)
+        except Exception as e:
+            print(f"❌ Server job {job_id} failed: {e}")
+            job = server_jobs().get(job_id)
+            _job_secrets.pop(job_id, None)
+            if job:
+                await finish_server_job(job, False, f"❌ Error: {e}")
+        finally:
+            _running_jobs.discard(job_id)
+            queue.task_done()
+
+async def server_job_workers() -> None:
+    # requeue what the previous run left behind, oldest first
+    queue = job_queue()
+    prune_server_jobs()
+    for job_id, job in sorted(server_jobs().items(), key=lambda kv: kv[1]["created"]):
+        if job["status"] in ("queued", "running"):
+            queue.put_nowait(job_id)
+    await asyncio.gather(*(server_job_worker() for _ in range(SERVER_JOB_WORKERS)))
+
+# =========================
+# Broadcasts (*drop)
+# =========================
+# Recipients are the guild's non-bot members in id order. The checkpoint
+# (done_until plus the counters) only moves past a recipient once everyone
+# before it is done, so a resumed broadcast re-sends at most the few DMs that
+# were in flight when the bot stopped.
+broadcasts: Dict[str, "Broadcast"] = {}
+
+class Broadcast:
+    def __init__(self, broadcast_id: str, record: Dict[str, Any]):
+        self.id = broadcast_id
+        self.record = record
+        self.interval = BROADCAST_MIN_INTERVAL
+        self.cancelled = False
+        self.pending: Dict[int, Tuple[int, str]] = {}  # index -> (member id, outcome), finished out of order
+        self.next_index = 0
+        self.unsaved = 0
+        self._next_start = 0.0
+        self._pace_lock = asyncio.Lock()
+
+    async def _pace(self) -> None:
+        async with self._pace_lock:
+            wait = self._next_start - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._next_start = time.monotonic() + self.interval
+
+    async def _send(self, member: Optional[discord.Member]) -> str:
+        if member is None:
+            return "failed"  # left the guild since the broadcast started
+        try:
+            await member.send(f"📢 {self.record['message']}")
+        except discord.Forbidden:
+            return "closed"
+        except discord.HTTPException as e:
+            if e.status == 429:
+                self.interval = min(self.interval * 2, BROADCAST_MAX_INTERVAL)
+            return "failed"
+        except Exception as e:
+            # network errors and timeouts must not take the other workers down with this one
+            print(f"⚠️ Broadcast {self.id}: DM to {member.id} failed: {e!r}")
+            return "failed"
+        self.interval = max(self.interval * 0.95, BROADCAST_MIN_INTERVAL)
+        return "delivered"
+
+    def _complete(self, index: int, member_id: int, outcome: str) -> None:
+        self.pending[index] = (member_id, outcome)
+        while self.next_index in self.pending:
+            member_id, outcome = self.pending.pop(self.next_index)
+            self.record[outcome] += 1
+            self.record["done_until"] = member_id
+            self.next_index += 1
+            self.unsaved += 1
+        if self.unsaved >= BROADCAST_CHECKPOINT_EVERY:
+            self.unsaved = 0
+            mark_dirty("broadcasts")
+
+    def status_text(self) -> str:
+        r = self.record
+        counts = {k: r[k] + sum(1 for _, o in self.pending.values() if o == k) for k in ("delivered", "closed", "failed")}
+        done = sum(counts.values())
+        pct = done * 100 // r["total"] if r["total"] else 100
+        line = f"📢 Broadcast `{self.id}` — **{r['status']}** {done}/{r['total']} ({pct}%)"
+        if r["status"] == "running":
+            eta = int((r["total"] - done) * self.interval)
+            line += f", ~{eta // 60}m{eta % 60:02d}s left"
+        return (f"{line}\n"
+                f"✅ Delivered: {counts['delivered']} | 📪 DMs closed: {counts['closed']} | ❌ Failed: {counts['failed']}")
+
+    async def _report(self) -> None:
+        while True:
+            await asyncio.sleep(BROADCAST_STATUS_INTERVAL)
+            await edit_status_message(self.record, self.status_text())
+
+    async def run(self) -> None:
+        r = self.record
+        guild = bot.get_guild(r["guild_id"])
+        recipients = sorted(m.id for m in guild.members if not m.bot and m.id > r["done_until"]) if guild else []
+        r["total"] = r["delivered"] + r["closed"] + r["failed"] + len(recipients)
+        work = iter(enumerate(recipients))  # shared by the workers, each recipient taken once
+
+        async def worker() -> None:
+            for index, member_id in work:
+                if self.cancelled:
+                    return
+                await self._pace()
+                self._complete(index, member_id, await self._send(guild.get_member(member_id)))
+
+        reporter = asyncio.create_task(self._report())
+        try:
+            if guild is None:
+                r["status"] = "failed"  # the bot is no longer in that guild
+            await asyncio.gather(*(worker() for _ in range(BROADCAST_CONCURRENCY)))
+            if r["status"] == "running":
+                r["status"] = "done"
+        finally:
+            # on shutdown the status stays "running" and the broadcast resumes from here
+            reporter.cancel()
+            broadcasts.pop(self.id, None)
+            if r["status"] != "running":
+                r["finished"] = time.time()
+            mark_dirty("broadcasts")
+        await edit_status_message(r, self.status_text())
+
+def start_broadcast(broadcast_id: str) -> None:
+    b = broadcasts[broadcast_id] = Broadcast(broadcast_id, data["broadcasts"][broadcast_id])
+    start_background_task(f"broadcast_{broadcast_id}", b.run)
+
+def prune_broadcasts() -> None:
+    records = data.get("broadcasts", {})
+    cutoff = time.time() - BROADCAST_RETENTION
+    stale = [b for b, r in records.items() if r.get("finished") and r["finished"] < cutoff]
+    for broadcast_id in stale:
+        del records[broadcast_id]
+    if stale:
+        mark_dirty("broadcasts")
+
+def resume_broadcasts() -> None:
+    prune_broadcasts()
+    for broadcast_id, record in data.get("broadcasts", {}).items():
+        if record["status"] == "running" and broadcast_id not in broadcasts:
+            start_broadcast(broadcast_id)
 
 # =========================
 # Events
@@ -349,35 +2021,108 @@ async def client_info(client_key: str, identifier: str) -> Tuple[bool, str]:
 @bot.event
 async def on_ready():
     print(f"✅ Logged in as {bot.user} | Prefix {PREFIX} | Version {BOT_VERSION}")
+    start_background_task("data_flush", data_flush_loop)
+    if METRICS_PORT:
+        start_background_task("metrics_server", metrics_server)
+    start_background_task("allocation_pool", allocation_pool_loop)
+    start_background_task("node_stats", node_stats_loop)
+    resume_broadcasts()
+    start_background_task("server_jobs", server_job_workers)
+    start_background_task("server_index", server_index_loop)
     await bot.change_presence(activity=discord.Game(name=f"{PREFIX}help | {BOT_VERSION}"))
 
 # =========================
 # HELP
 # =========================
-@bot.command(name="help")
-async def help_cmd(ctx: commands.Context):
+# Static embeds are rendered once and reused until the values they are built
+# from change; the cooldown check answers spam without rendering anything.
+_embed_cache: Dict[str, Tuple[Any, discord.Embed]] = {}
+
+class StaticCooldown:
+    # `rate` calls per `per` seconds for each user or channel. discord.py's
+    # CooldownMapping scans every live bucket on each lookup, so a raid by many
+    # accounts made every check slower; here expired windows are dropped at
+    # most once per period.
+    def __init__(self, rate: int, per: float, bucket_type: commands.BucketType):
+        self.cooldown = commands.Cooldown(rate, per)
+        self.type = bucket_type
+        self.windows: Dict[int, Tuple[float, int]] = {}  # user or channel id -> (window start, calls in it)
+        self.pruned_at = time.monotonic()
+
+    def hit(self, key: int) -> float:
+        # counts a call; seconds until the next allowed one, or 0 when this one may go through
+        now = time.monotonic()
+        per, rate = self.cooldown.per, self.cooldown.rate
+        if now - self.pruned_at >= per:
+            self.windows = {k: w for k, w in self.windows.items() if now - w[0] < per}
+            self.pruned_at = now
+        start, used = self.windows.get(key, (now, 0))
+        if now - start >= per:
+            start, used = now, 0
+        if used >= rate:
+            return start + per - now
+        self.windows[key] = (start, used + 1)
+        return 0.0
+
+_static_cooldowns = (
+    StaticCooldown(1, STATIC_USER_COOLDOWN, commands.BucketType.user),
+    StaticCooldown(STATIC_CHANNEL_RATE, STATIC_CHANNEL_PER, commands.BucketType.channel),
+)
+
+def cached_embed(name: str, key: Any, build: Callable[[], discord.Embed]) -> discord.Embed:
+    hit = _embed_cache.get(name)
+    if hit is None or hit[0] != key:
+        hit = _embed_cache[name] = (key, build())
+    return hit[1]
+
+def static_cooldown():
+    async def predicate(ctx: commands.Context) -> bool:
+        if is_admin_member(ctx.author):
+            return True
+        for limit in _static_cooldowns:
+            key = ctx.author.id if limit.type is commands.BucketType.user else ctx.channel.id
+            retry_after = limit.hit(key)
+            if retry_after:
+                raise commands.CommandOnCooldown(limit.cooldown, retry_after, limit.type)
+        return True
+    return commands.check(predicate)
+
+def build_help_embed() -> discord.Embed:
     em = discord.Embed(title="Bot Help", color=discord.Color.blurple())
     em.add_field(name="User", value=(
         f"`{PREFIX}register <email> <password>` — link/create panel user\n"
         f"`{PREFIX}create <name> <ramMB> <cpu%> <diskMB> [egg]` — create (link required)\n"
-        f"`{PREFIX}plans` `{PREFIX}i [@user]` `{PREFIX}upgrade` `{PREFIX}serverinfo` `{PREFIX}botinfo`"
+        f"`{PREFIX}job <id>` — status of a server creation job\n"
+        f"`{PREFIX}plans` `{PREFIX}i [@user]` `{PREFIX}upgrade` `{PREFIX}serverinfo` `{PREFIX}botinfo` `{PREFIX}node [node_id]`"
     ), inline=False)
     em.add_field(name="Manage (client)", value=(
         f"`{PREFIX}manage key <client_api_key>`\n"
-        f"`{PREFIX}manage start/stop/restart/kill <identifier>`\n"
+        f"`{PREFIX}manage list` — your servers\n"
+        f"`{PREFIX}manage start/stop/restart/kill <identifier|all>`\n"
         f"`{PREFIX}manage reinstall <identifier>`\n"
-        f"`{PREFIX}manage info <identifier>`"
+        f"`{PREFIX}manage info <identifier>`\n"
+        f"`{PREFIX}manage panel <identifier>` — control buttons\n"
+        f"`{PREFIX}console <identifier>` — live console\n"
+        f"`{PREFIX}stats <identifier>` — live CPU/memory/disk/network"
     ), inline=False)
     em.add_field(name="Admin", value=(
         f"`{PREFIX}admin add_i @user <amount>` / `remove_i @user <amount>`\n"
         f"`{PREFIX}admin add_a @user` / `rm_a @user`\n"
         f"`{PREFIX}admin create_a @user <email> <password>`\n"
         f"`{PREFIX}admin rm_ac @user`\n"
-        f"`{PREFIX}admin create_s <owner_email> <egg> <name> <ram> <cpu> <disk>`\n"
-        f"`{PREFIX}admin delete_s <server_id>` `{PREFIX}admin serverlist`\n"
+        f"`{PREFIX}admin create_s <owner_email> <egg> <name> <ram> <cpu> <disk> [node_id]`\n"
+        f"`{PREFIX}admin bulk_create` + CSV/JSON attachment (email, egg, name, ram, cpu, disk[, node])\n"
+        f"`{PREFIX}admin bulk <suspend|unsuspend|reinstall> <filters...> [dry]` — owner:/egg:/node:/name:/inactive:\n"
+        f"`{PREFIX}admin delete_s <server_id>` `{PREFIX}admin serverlist` `{PREFIX}admin stats` `{PREFIX}admin tiers` `{PREFIX}admin breaker`\n"
         f"`{PREFIX}admin newmsg <channel_id> <text>` `{PREFIX}admin lock` / `unlock`"
     ), inline=False)
     em.set_footer(text=f"{MADE_BY} • {SERVER_LOCATION} • {BOT_VERSION}")
+    return em
+
+@bot.command(name="help")
+@static_cooldown()
+async def help_cmd(ctx: commands.Context):
+    em = cached_embed("help", (PREFIX, MADE_BY, SERVER_LOCATION, BOT_VERSION), build_help_embed)
     await ctx.reply(embed=em, mention_author=False)
 
 # -------------------- USER CREATE OWN API KEY --------------------
@@ -421,29 +2166,53 @@ async def createkey(ctx, email: str, password: str, namekey: str):
 # =========================
 # Plans / invites / info
 # =========================
+class Plan(NamedTuple):
+    name: str
+    invites: int
+    ram: int
+    cpu: int
+    disk: int
+
+class TierTable:
+    # plans sorted by invite threshold; a lookup is a bisect over the thresholds
+    def __init__(self, plans: Iterable[tuple]):
+        self.plans = sorted((Plan(*p) for p in plans), key=lambda p: p.invites)
+        self.thresholds = [p.invites for p in self.plans]
+
+    def for_invites(self, invites: int) -> Plan:
+        # below the lowest threshold still gets the lowest plan
+        return self.plans[max(bisect.bisect_right(self.thresholds, invites) - 1, 0)]
+
+    def for_users(self, user_ids: Optional[Iterable[str]] = None) -> Dict[str, Plan]:
+        # batch lookup (leaderboards, audits): one pass over the invite counts
+        invites = data.get("invites", {})
+        ids = invites.keys() if user_ids is None else user_ids
+        return {uid: self.for_invites(int(invites.get(uid, 0))) for uid in ids}
+
+    def check_limits(self, invites: int, ram: int, cpu: int, disk: int) -> Optional[str]:
+        # None if the request fits the user's plan, else why not
+        plan = self.for_invites(invites)
+        if ram <= plan.ram and cpu <= plan.cpu and disk <= plan.disk:
+            return None
+        return (f"❌ Your **{plan.name}** plan allows up to RAM {plan.ram}MB | CPU {plan.cpu}% | Disk {plan.disk}MB. "
+                f"Invite more people to upgrade — see `{PREFIX}plans`.")
+
+tiers = TierTable(PLANS)
+
+def build_plans_embed() -> discord.Embed:
+    desc = "\n\n".join([f"**{p.name}** — at {p.invites} invites\nRAM {p.ram}MB | CPU {p.cpu}% | Disk {p.disk}MB" for p in tiers.plans])
+    return discord.Embed(title="Invite Plans", description=desc, color=discord.Color.gold())
+
 @bot.command(name="plans")
+@static_cooldown()
 async def plans_cmd(ctx):
-    plans = [
-        ("Basic", 0, 4096, 150, 10000),
-        ("Advanced", 4, 6144, 200, 15000),
-        ("Pro", 6, 7168, 230, 20000),
-        ("Premium", 8, 9216, 270, 25000),
-        ("Elite", 15, 12288, 320, 30000),
-        ("Ultimate", 20, 16384, 400, 35000),
-    ]
-    desc = "\n\n".join([f"**{n}** — at {inv} invites\nRAM {ram}MB | CPU {cpu}% | Disk {disk}MB" for (n, inv, ram, cpu, disk) in plans])
-    await ctx.reply(embed=discord.Embed(title="Invite Plans", description=desc, color=discord.Color.gold()))
+    await ctx.reply(embed=cached_embed("plans", tuple(tiers.plans), build_plans_embed))
 
 @bot.command(name="i")
 async def i_cmd(ctx, member: Optional[discord.Member] = None):
     target = member or ctx.author
     invites = int(data.get("invites", {}).get(str(target.id), 0))
-    tier = "Basic"
-    if invites >= 20: tier = "Ultimate"
-    elif invites >= 15: tier = "Elite"
-    elif invites >= 8: tier = "Premium"
-    elif invites >= 6: tier = "Pro"
-    elif invites >= 4: tier = "Advanced"
+    tier = tiers.for_invites(invites).name
     em = discord.Embed(title=f"Invites — {target.display_name}", color=discord.Color.blue())
     em.add_field(name="Total Invites", value=str(invites))
     em.add_field(name="Tier", value=tier)
@@ -465,13 +2234,17 @@ async def serverinfo_cmd(ctx):
     em.add_field(name="Boosts", value=str(g.premium_subscription_count))
     await ctx.reply(embed=em)
 
-@bot.command(name="botinfo")
-async def botinfo_cmd(ctx):
+def build_botinfo_embed() -> discord.Embed:
     em = discord.Embed(title="Bot Info", color=discord.Color.purple())
     em.add_field(name="Version", value=BOT_VERSION)
     em.add_field(name="Made By", value=MADE_BY)
     em.add_field(name="Location", value=SERVER_LOCATION)
-    await ctx.reply(embed=em)
+    return em
+
+@bot.command(name="botinfo")
+@static_cooldown()
+async def botinfo_cmd(ctx):
+    await ctx.reply(embed=cached_embed("botinfo", (BOT_VERSION, MADE_BY, SERVER_LOCATION), build_botinfo_embed))
 
 # =========================
 # Register & Create (User)
@@ -485,7 +2258,7 @@ async def register_cmd(ctx, email: str, password: str):
         if not uid:
             return await ctx.reply("❌ Failed to create or find panel user. Check API/permissions.")
         data.setdefault("panel_users", {})[str(ctx.author.id)] = uid
-        save_data(data)
+        await save_data("panel_users")
         await ctx.reply(f"✅ Linked panel user id `{uid}` to your Discord account.")
     except Exception as e:
         await ctx.reply(f"❌ Error: {e}")
@@ -502,166 +2275,700 @@ async def create_user_server_cmd(ctx, name: str, ram: int, cpu: int, disk: int,
     if not uid:
         return await ctx.reply(f"⚠️ Pehle apna panel account link karo: `{PREFIX}register <email> <password>`")
 
-    await ctx.reply("⚙️ Creating your server — please wait...")
-
-    ok, msg = await create_server_app(
-        name=name,
-        owner_panel_id=uid,
-        egg_key=egg,
-        memory=ram,
-        cpu=cpu,
-        disk=disk
-    )
-
-    if ok:
-        # Save server info taaki dubara create na kar sake
-        if "user_servers" not in data:
-            data["user_servers"] = {}
-        data["user_servers"][user_id] = {
-            "name": name,
-            "ram": ram,
-            "cpu": cpu,
-            "disk": disk,
-            "egg": egg
-        }
-        save_data(data)
+    over = tiers.check_limits(int(data.get("invites", {}).get(user_id, 0)), ram, cpu, disk)
+    if over:
+        return await ctx.reply(over)
 
-    await ctx.reply(msg)
+    if egg not in EGG_CATALOG:
+        return await ctx.reply(f"❌ Unknown egg. Available:\n{egg_list_text()}")
+
+    # the job records the server in user_servers once it is created
+    await submit_server_job(ctx, "create", user_id, {
+        "name": name,
+        "owner_panel_id": uid,
+        "egg_key": egg,
+        "memory": ram,
+        "cpu": cpu,
+        "disk": disk
+    })
+
+@bot.command(name="job")
+async def job_cmd(ctx, job_id: str):
+    job = server_jobs().get(job_id)
+    if not job or (str(ctx.author.id) not in (job["requester"], job["owner"]) and not is_admin_member(ctx.author)):
+        return await ctx.reply("❌ No such job.")
+    server = job["server"]
+    lines = [f"🧾 Job `{job_id}` — **{server['name']}** ({server['memory']}MB / {server['cpu']}% / {server['disk']}MB)"]
+    if job["status"] == "queued":
+        lines.append(f"🕒 Queued, {queued_ahead(job_id)} job(s) ahead")
+    elif job["status"] == "running":
+        lines.append("⚙️ Creating on the panel...")
+    else:
+        lines.append(job["result"])
+    await ctx.reply("\n".join(lines))
 
 # =========================
 # Manage group (client API)
 # =========================
+# Control panel buttons carry their action and the server identifier in the
+# custom_id and are registered once as a dynamic item (PanelBot.setup_hook):
+# they keep working after a restart and nothing is held in memory per posted
+# panel. The clicking user's own client key is looked up from storage.
+# action -> (label, style, emoji)
+PANEL_BUTTONS: Dict[str, Tuple[str, discord.ButtonStyle, Optional[str]]] = {
+    "start": ("Start", discord.ButtonStyle.success, None),
+    "stop": ("Stop", discord.ButtonStyle.danger, None),
+    "restart": ("Restart", discord.ButtonStyle.primary, None),
+    "reinstall": ("Reinstall", discord.ButtonStyle.secondary, None),
+    "more": ("More", discord.ButtonStyle.blurple, "⚙️"),
+}
+MORE_BUTTONS: Dict[str, Tuple[str, discord.ButtonStyle, Optional[str]]] = {
+    "upload": ("Upload File", discord.ButtonStyle.success, "📤"),
+    "delete": ("Delete File", discord.ButtonStyle.danger, "🗑️"),
+    "list": ("List Files", discord.ButtonStyle.secondary, "📂"),
+    "download": ("Download File", discord.ButtonStyle.secondary, "📥"),
+    "edit": ("Edit File", discord.ButtonStyle.primary, "✏️"),
+    "backup": ("Create Backup", discord.ButtonStyle.success, "💾"),
+    "cmd": ("Run CMD", discord.ButtonStyle.blurple, "💻"),
+    "op": ("Add Operator", discord.ButtonStyle.green, "👑"),
+    "exit": ("Exit", discord.ButtonStyle.danger, "❌"),
+}
+def client_key_for(user_id: Any) -> Optional[str]:
+    return data.get("client_keys", {}).get(str(user_id))
+
+class ServerButton(discord.ui.DynamicItem[discord.ui.Button], template=r"srv:(?P<action>[a-z]+):(?P<identifier>[0-9A-Za-z-]+)"):
+    def __init__(self, action: str, identifier: str):
+        label, style, emoji = {**PANEL_BUTTONS, **MORE_BUTTONS}[action]
+        super().__init__(discord.ui.Button(label=label, style=style, emoji=emoji, custom_id=f"srv:{action}:{identifier}"))
+        self.action = action
+        self.identifier = identifier
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match: re.Match):
+        if match["action"] not in PANEL_BUTTONS and match["action"] not in MORE_BUTTONS:
+            raise ValueError(f"unknown panel action {match['action']}")
+        return cls(match["action"], match["identifier"])
+
+    async def callback(self, interaction: discord.Interaction) -> None:
+        if self.action == "exit":
+            return await interaction.response.edit_message(content="❌ Exited advanced controls.", embed=None, view=None)
+        key = client_key_for(interaction.user.id)
+        if not key:
+            return await interaction.response.send_message(f"🔑 Link your client API key first: `{PREFIX}manage key <client_api_key>`", ephemeral=True)
+        if self.action == "more":
+            embed = discord.Embed(
+                title=f"🛠️ Advanced Controls — {self.identifier}",
+                description="Extra tools for file & server management",
+                color=discord.Color.orange()
+            )
+            return await interaction.response.send_message(embed=embed, view=ServerControlView(self.identifier, MORE_BUTTONS), ephemeral=True)
+        if self.action in MORE_ACTIONS:
+            return await MORE_ACTIONS[self.action](interaction, key, self.identifier)
+
+        _track_interaction(interaction)
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        identifier, err = await client_servers.resolve(key, self.identifier)
+        if identifier is None:
+            return await interaction.followup.send(err, ephemeral=True)
+        if self.action == "reinstall":
+            ok, msg = await client_reinstall(key, identifier)
+        else:
+            ok, msg = await client_power(key, identifier, self.action)
+        await interaction.followup.send(msg, ephemeral=True)
+
 class ServerControlView(discord.ui.View):
-    def __init__(self, token: str, serverid: str):
-        super().__init__(timeout=None)
-        self.token = token
-        self.serverid = serverid
-        self.base = f"https://panel.fluidmc.fun/api/client/servers/{self.serverid}"
-
-    async def _client(self):
-        headers = {
-            "Authorization": f"Bearer {self.token}",
-            "Accept": "application/json",
-            "Content-Type": "application/json"
-        }
-class ServerControlView(discord.ui.View):
-    def __init__(self, token: str, serverid: str):
+    def __init__(self, identifier: str, buttons: Dict[str, Any] = PANEL_BUTTONS):
         super().__init__(timeout=None)
-        self.token = token
-        self.serverid = serverid
-        self.base = f"https://panel.fluidmc.fun/api/client/servers/{self.serverid}"
-
-    # -------------------- POWER CONTROLS --------------------
-    async def send_power_signal(self, interaction: discord.Interaction, signal: str):
-        url = f"{self.base}/power"
-        headers = {"Authorization": f"Bearer {self.token}", "Accept": "application/json", "Content-Type": "application/json"}
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=headers, json={"signal": signal}) as resp:
-                if resp.status == 204:
-                    await interaction.response.send_message(f"✅ `{signal}` sent to `{self.serverid}`.", ephemeral=True)
-                else:
-                    await interaction.response.send_message(f"❌ Failed to send `{signal}`. Status: {resp.status}", ephemeral=True)
-
-    @discord.ui.button(label="Start", style=discord.ButtonStyle.success)
-    async def start_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await self.send_power_signal(interaction, "start")
-
-    @discord.ui.button(label="Stop", style=discord.ButtonStyle.danger)
-    async def stop_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await self.send_power_signal(interaction, "stop")
-
-    @discord.ui.button(label="Restart", style=discord.ButtonStyle.primary)
-    async def restart_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await self.send_power_signal(interaction, "restart")
-
-    @discord.ui.button(label="Reinstall", style=discord.ButtonStyle.secondary)
-    async def reinstall_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await self.send_power_signal(interaction, "reinstall")
-
-    # -------------------- ADVANCED MORE BUTTON --------------------
-    @discord.ui.button(label="More", style=discord.ButtonStyle.blurple, emoji="⚙️")
-    async def more_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
-        embed = discord.Embed(
-            title=f"🛠️ Advanced Controls — {self.serverid}",
-            description="Extra tools for file & server management",
-            color=discord.Color.orange()
-        )
+        for action in buttons:
+            self.add_item(ServerButton(action, identifier))
+        # clicks are routed through the registered dynamic item, so the view
+        # itself must not be kept in discord.py's view store
+        self.stop()
+
+# --- "More" tools. Each opens a one-field modal where it needs input; the
+# modal, pager and editor objects are short-lived and time out on their own.
+_file_ops: Dict[int, int] = {}  # user id -> file operations running
+
+def _track_interaction(interaction: discord.Interaction) -> None:
+    # what _track_command does for prefix commands
+    _command_priority.set(0 if is_admin_member(interaction.user) else 1)
+    _command_deadline.set(time.monotonic() + COMMAND_DEADLINE)
+
+def _take_file_op(user_id: int) -> bool:
+    if _file_ops.get(user_id, 0) >= FILE_OPS_PER_USER:
+        return False
+    _file_ops[user_id] = _file_ops.get(user_id, 0) + 1
+    return True
+
+def _release_file_op(user_id: int) -> None:
+    _file_ops[user_id] -= 1
+    if not _file_ops[user_id]:
+        del _file_ops[user_id]
+
+def _file_ops_busy() -> str:
+    return f"⏳ You already have {FILE_OPS_PER_USER} file operations running; wait for one to finish."
+
+async def run_file_op(interaction: discord.Interaction, work: Callable[[], Any], limited: bool = True) -> None:
+    # defers, bounds concurrent file operations per user (unless the work takes
+    # its own slot later, like an upload waiting for its attachment), and reports errors
+    user_id = interaction.user.id
+    if limited and not _take_file_op(user_id):
+        return await interaction.response.send_message(_file_ops_busy(), ephemeral=True)
+    try:
+        _track_interaction(interaction)
+        if not interaction.response.is_done():
+            await interaction.response.defer(ephemeral=True, thinking=True)
+        await work()
+    except Exception as e:
+        await interaction.followup.send(f"❌ Error: {e}", ephemeral=True)
+    finally:
+        if limited:
+            _release_file_op(user_id)
+
+class InputModal(discord.ui.Modal):
+    def __init__(self, title: str, label: str, on_submit: Callable[[discord.Interaction, str], Any], default: str = "", long: bool = False, max_length: int = 4000):
+        super().__init__(title=title, timeout=300)
+        self.field = discord.ui.TextInput(label=label, default=default or None, max_length=max_length,
+                                          style=discord.TextStyle.paragraph if long else discord.TextStyle.short)
+        self.add_item(self.field)
+        self._on_submit = on_submit
+
+    async def on_submit(self, interaction: discord.Interaction) -> None:
+        await self._on_submit(interaction, self.field.value.strip() if self.field.style == discord.TextStyle.short else self.field.value)
+
+class FileListView(discord.ui.View):
+    def __init__(self, directory: str, files: List[Dict[str, Any]]):
+        super().__init__(timeout=300)
+        self.directory = directory
+        # folders first, then files, alphabetical
+        self.files = sorted(files, key=lambda f: (f.get("is_file", True), str(f.get("name", "")).lower()))
+        self.page = 0
+        self.pages = max(1, -(-len(self.files) // FILE_LIST_PAGE_SIZE))
+        self._sync_buttons()
+
+    def embed(self) -> discord.Embed:
+        start = self.page * FILE_LIST_PAGE_SIZE
+        lines = []
+        for f in self.files[start:start + FILE_LIST_PAGE_SIZE]:
+            if f.get("is_file", True):
+                lines.append(f"📄 `{f.get('name')}` — {int(f.get('size', 0) or 0):,} B")
+            else:
+                lines.append(f"📁 `{f.get('name')}/`")
+        em = discord.Embed(title=f"📂 {self.directory}", description="\n".join(lines) or "*(empty)*", color=discord.Color.orange())
+        em.set_footer(text=f"Page {self.page + 1}/{self.pages} • {len(self.files)} entries")
+        return em
+
+    def _sync_buttons(self) -> None:
+        self.prev_btn.disabled = self.page == 0
+        self.next_btn.disabled = self.page >= self.pages - 1
+
+    async def _turn(self, interaction: discord.Interaction, step: int) -> None:
+        self.page = min(max(self.page + step, 0), self.pages - 1)
+        self._sync_buttons()
+        await interaction.response.edit_message(embed=self.embed(), view=self)
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def prev_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._turn(interaction, -1)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._turn(interaction, 1)
+
+class FileEditorView(discord.ui.View):
+    # a modal cannot answer a modal, so the editor opens from a button
+    def __init__(self, key: str, identifier: str, path: str, content: str):
+        super().__init__(timeout=300)
+        self.key, self.identifier, self.path, self.content = key, identifier, path, content
+
+    @discord.ui.button(label="Open editor", style=discord.ButtonStyle.primary, emoji="✏️")
+    async def open_btn(self, interaction: discord.Interaction, button: discord.ui.Button):
+        async def save(i: discord.Interaction, content: str) -> None:
+            async def work() -> None:
+                ok, msg = await client_write_file(self.key, self.identifier, self.path, content)
+                await i.followup.send(msg, ephemeral=True)
+            await run_file_op(i, work)
+        await interaction.response.send_modal(InputModal(f"Edit {posixpath.basename(self.path)}"[:45], self.path[-45:], save,
+                                                         default=self.content, long=True, max_length=FILE_EDIT_MAX_BYTES))
+
+async def more_upload(interaction: discord.Interaction, key: str, identifier: str) -> None:
+    async def submit(i: discord.Interaction, directory: str) -> None:
+        async def work() -> None:
+            await i.followup.send(f"📤 Send the file in this channel within {FILE_UPLOAD_WAIT}s; it goes to `{directory}`.", ephemeral=True)
+            try:
+                msg = await bot.wait_for("message", timeout=FILE_UPLOAD_WAIT,
+                                         check=lambda m: m.author.id == i.user.id and m.channel.id == i.channel_id and m.attachments)
+            except asyncio.TimeoutError:
+                return await i.followup.send("⌛ No file received; upload cancelled.", ephemeral=True)
+            # the slot is only taken for the transfer, not while waiting for the file
+            if not _take_file_op(i.user.id):
+                return await i.followup.send(_file_ops_busy(), ephemeral=True)
+            try:
+                url, err = await client_signed_url(key, identifier, "upload")
+                if not url:
+                    return await i.followup.send(err, ephemeral=True)
+                results = [await stream_upload(a.url, url, a.filename, directory) for a in msg.attachments]
+                await i.followup.send("\n".join(text for ok, text in results), ephemeral=True)
+            finally:
+                _release_file_op(i.user.id)
+        await run_file_op(i, work, limited=False)
+    await interaction.response.send_modal(InputModal("Upload File", "Target directory", submit, default="/"))
+
+async def more_download(interaction: discord.Interaction, key: str, identifier: str) -> None:
+    async def submit(i: discord.Interaction, path: str) -> None:
+        async def work() -> None:
+            url, err = await client_signed_url(key, identifier, "download", params={"file": path})
+            if not url:
+                return await i.followup.send(err, ephemeral=True)
+            file, msg = await stream_download(url, posixpath.basename(path) or "download")
+            if file is None:
+                return await i.followup.send(msg, ephemeral=True)
+            try:
+                await i.followup.send(f"📥 `{path}`", file=file, ephemeral=True)
+            finally:
+                file.close()
+        await run_file_op(i, work)
+    await interaction.response.send_modal(InputModal("Download File", "File path", submit, default="/"))
+
+async def more_list(interaction: discord.Interaction, key: str, identifier: str) -> None:
+    async def submit(i: discord.Interaction, directory: str) -> None:
+        async def work() -> None:
+            files, err = await client_list_files(key, identifier, directory or "/")
+            if files is None:
+                return await i.followup.send(err, ephemeral=True)
+            view = FileListView(directory or "/", files)
+            await i.followup.send(embed=view.embed(), view=view, ephemeral=True)
+        await run_file_op(i, work)
+    await interaction.response.send_modal(InputModal("List Files", "Directory", submit, default="/"))
+
+async def more_edit(interaction: discord.Interaction, key: str, identifier: str) -> None:
+    async def submit(i: discord.Interaction, path: str) -> None:
+        async def work() -> None:
+            content, err = await client_read_file(key, identifier, path, FILE_EDIT_MAX_BYTES)
+            if content is None:
+                return await i.followup.send(err, ephemeral=True)
+            if len(content) > FILE_EDIT_MAX_BYTES:
+                return await i.followup.send(f"❌ `{path}` has more than {FILE_EDIT_MAX_BYTES} characters; use Download instead.", ephemeral=True)
+            await i.followup.send(f"✏️ `{path}` loaded ({len(content)} characters).", view=FileEditorView(key, identifier, path, content), ephemeral=True)
+        await run_file_op(i, work)
+    await interaction.response.send_modal(InputModal("Edit File", "File path", submit, default="/"))
+
+async def more_delete(interaction: discord.Interaction, key: str, identifier: str) -> None:
+    async def submit(i: discord.Interaction, path: str) -> None:
+        async def work() -> None:
+            ok, msg = await client_delete_file(key, identifier, path)
+            await i.followup.send(msg, ephemeral=True)
+        await run_file_op(i, work)
+    await interaction.response.send_modal(InputModal("Delete File", "File path", submit, default="/"))
+
+async def more_backup(interaction: discord.Interaction, key: str, identifier: str) -> None:
+    async def work() -> None:
+        ok, msg = await client_backup(key, identifier)
+        await interaction.followup.send(msg, ephemeral=True)
+    await run_file_op(interaction, work)
+
+async def more_cmd(interaction: discord.Interaction, key: str, identifier: str) -> None:
+    async def submit(i: discord.Interaction, command: str) -> None:
+        _track_interaction(i)
+        await i.response.defer(ephemeral=True, thinking=True)
+        ok, msg = await client_command(key, identifier, command)
+        await i.followup.send(msg, ephemeral=True)
+    await interaction.response.send_modal(InputModal("Run CMD", "Console command", submit))
+
+async def more_op(interaction: discord.Interaction, key: str, identifier: str) -> None:
+    async def submit(i: discord.Interaction, username: str) -> None:
+        if not re.fullmatch(r"[A-Za-z0-9_]{3,16}", username):
+            return await i.response.send_message("❌ That is not a valid Minecraft username.", ephemeral=True)
+        _track_interaction(i)
+        await i.response.defer(ephemeral=True, thinking=True)
+        ok, msg = await client_command(key, identifier, f"op {username}")
+        await i.followup.send(f"👑 `{username}` is now an operator." if ok else msg, ephemeral=True)
+    await interaction.response.send_modal(InputModal("Add Operator", "Minecraft username", submit, max_length=16))
+
+MORE_ACTIONS: Dict[str, Callable[[discord.Interaction, str, str], Any]] = {
+    "upload": more_upload,
+    "delete": more_delete,
+    "list": more_list,
+    "download": more_download,
+    "edit": more_edit,
+    "backup": more_backup,
+    "cmd": more_cmd,
+    "op": more_op,
+}
+
+@bot.group(name="manage", invoke_without_command=True)
+async def manage_grp(ctx):
+    await ctx.reply("Use manage subcommands (key/list/panel/start/stop/restart/kill/reinstall/info)")
+
+@manage_grp.command(name="key")
+async def manage_key(ctx, client_api_key: str):
+    try:
+        await ctx.message.delete()  # hide the key from chat
+    except discord.HTTPException:
+        pass
+    # listing the key's servers both checks the key and fills the cache
+    servers, err = await client_servers.servers(client_api_key, 0)
+    if servers is None:
+        return await ctx.send(f"{ctx.author.mention} {err}")
+    old = client_key_for(ctx.author.id)
+    if old and old != client_api_key:
+        client_servers.forget(old)
+    data.setdefault("client_keys", {})[str(ctx.author.id)] = client_api_key
+    await save_data("client_keys", durable=True)
+    await ctx.send(f"✅ {ctx.author.mention} client API key saved ({len(servers)} servers).")
+
+async def _manage_key_or_reply(ctx) -> Optional[str]:
+    key = client_key_for(ctx.author.id)
+    if not key:
+        await ctx.reply(f"🔑 Link your client API key first: `{PREFIX}manage key <client_api_key>`")
+    return key
+
+async def _manage_server_or_reply(ctx, identifier: str) -> Tuple[Optional[str], Optional[str]]:
+    # (client key, resolved identifier), or (None, None) after telling the user why not
+    key = await _manage_key_or_reply(ctx)
+    if not key:
+        return None, None
+    found, err = await client_servers.resolve(key, identifier)
+    if found is None:
+        await ctx.reply(err)
+        return None, None
+    return key, found
+
+@manage_grp.command(name="list")
+async def manage_list(ctx):
+    key = await _manage_key_or_reply(ctx)
+    if not key: return
+    servers, err = await client_servers.servers(key)
+    if servers is None:
+        return await ctx.reply(err)
+    if not servers:
+        return await ctx.reply("You have no servers on the panel.")
+    lines = [f"- `{i}` {s['name']}" + (" (shared)" if not s["owner"] else "") + (" ⛔ suspended" if s["suspended"] else "")
+             for i, s in sorted(servers.items(), key=lambda kv: kv[1]["name"].lower())]
+    await ctx.reply("\n".join(lines)[:1900])
 
-        view = discord.ui.View()
-
-        # File Upload
-        @discord.ui.button(label="Upload File", style=discord.ButtonStyle.success, emoji="📤")
-        async def upload_file(_, i: discord.Interaction):
-            await i.response.send_message("📤 Send me the file to upload (attach file).", ephemeral=True)
-
-        # Delete File
-        @discord.ui.button(label="Delete File", style=discord.ButtonStyle.danger, emoji="🗑️")
-        async def delete_file(_, i: discord.Interaction):
-            await i.response.send_message("🗑️ Enter file path to delete:", ephemeral=True)
-
-        # List Files
-        @discord.ui.button(label="List Files", style=discord.ButtonStyle.secondary, emoji="📂")
-        async def list_file(_, i: discord.Interaction):
-            await i.response.send_message("📂 Fetching file list from Pterodactyl...", ephemeral=True)
-
-        # Edit File
-        @discord.ui.button(label="Edit File", style=discord.ButtonStyle.primary, emoji="✏️")
-        async def edit_file(_, i: discord.Interaction):
-            await i.response.send_message("✏️ Enter file path to edit:", ephemeral=True)
-
-        # Create Backup
-        @discord.ui.button(label="Create Backup", style=discord.ButtonStyle.success, emoji="💾")
-        async def create_backup(_, i: discord.Interaction):
-            await i.response.send_message("💾 Backup requested...", ephemeral=True)
-
-        # Run CMD
-        @discord.ui.button(label="Run CMD", style=discord.ButtonStyle.blurple, emoji="💻")
-        async def run_cmd(_, i: discord.Interaction):
-            await i.response.send_message("💻 Enter command to run on server:", ephemeral=True)
-
-        # Add Operator (Minecraft OP)
-        @discord.ui.button(label="Add Operator", style=discord.ButtonStyle.green, emoji="👑")
-        async def add_op(_, i: discord.Interaction):
-            await i.response.send_message("👑 Enter Minecraft username to OP:", ephemeral=True)
-
-        # Exit
-        @discord.ui.button(label="Exit", style=discord.ButtonStyle.danger, emoji="❌")
-        async def exit_panel(_, i: discord.Interaction):
-            await i.response.send_message("❌ Exited advanced controls.", ephemeral=True)
-
-        # add all buttons
-        view.add_item(upload_file)
-        view.add_item(delete_file)
-        view.add_item(list_file)
-        view.add_item(edit_file)
-        view.add_item(create_backup)
-        view.add_item(run_cmd)
-        view.add_item(add_op)
-        view.add_item(exit_panel)
-
-        await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+async def manage_power_all(ctx, signal: str) -> None:
+    # every server the key owns (not ones shared with it), all at once within CLIENT_BULK_PARALLELISM
+    key = await _manage_key_or_reply(ctx)
+    if not key: return
+    servers, err = await client_servers.servers(key)
+    if servers is None:
+        return await ctx.reply(err)
+    targets = [s for s in servers.values() if s["owner"] and not s["suspended"]]
+    if not targets:
+        return await ctx.reply("❌ You own no servers that can be powered.")
+    sem = asyncio.Semaphore(CLIENT_BULK_PARALLELISM)
+    failures: List[str] = []
+
+    async def send(s: Dict[str, Any]) -> None:
+        async with sem:
+            ok, msg = await client_power(key, s["identifier"], signal)
+            if not ok:
+                failures.append(f"- `{s['identifier']}` {s['name']}: {msg[:120]}")
+
+    await asyncio.gather(*(send(s) for s in targets))
+    lines = [f"⚡ `{signal}` on {len(targets)} servers: ✅ {len(targets) - len(failures)} sent | ❌ {len(failures)} failed"]
+    lines += failures[:10]
+    if len(failures) > 10:
+        lines.append(f"... and {len(failures) - 10} more failures")
+    await ctx.reply("\n".join(lines)[:1900])
+
+@manage_grp.command(name="start", aliases=["stop", "restart", "kill"])
+async def manage_power(ctx, identifier: str):
+    if identifier.lower() == "all":
+        return await manage_power_all(ctx, ctx.invoked_with)
+    key, identifier = await _manage_server_or_reply(ctx, identifier)
+    if not key: return
+    ok, msg = await client_power(key, identifier, ctx.invoked_with)
+    await ctx.reply(msg)
+
+@manage_grp.command(name="reinstall")
+async def manage_reinstall(ctx, identifier: str):
+    key, identifier = await _manage_server_or_reply(ctx, identifier)
+    if not key: return
+    ok, msg = await client_reinstall(key, identifier)
+    await ctx.reply(msg)
+
+@manage_grp.command(name="info")
+async def manage_info(ctx, identifier: str):
+    key, identifier = await _manage_server_or_reply(ctx, identifier)
+    if not key: return
+    ok, msg = await client_info(key, identifier)
+    await ctx.reply(msg)
+
+@manage_grp.command(name="panel")
+async def manage_panel(ctx, identifier: str):
+    key, identifier = await _manage_server_or_reply(ctx, identifier)
+    if not key: return
+    ok, msg = await client_info(key, identifier)
+    if not ok:
+        return await ctx.reply(msg)
+    em = discord.Embed(title=f"🎛️ Server Control — {identifier}", description=msg, color=discord.Color.blurple())
+    await ctx.reply(embed=em, view=ServerControlView(identifier))
+
+# =========================
+# Live console and stats (*console, *stats)
+# =========================
+# One websocket per server, shared by everyone watching its console or stats.
+# Console output lands in a rolling buffer and stats samples in a ring buffer
+# of history; a render loop edits the viewers' messages within the edit
+# budget and closes the socket once every viewer has gone idle.
+_ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;?]*[ -/]*[@-~]")
+_SPARK_BARS = "▁▂▃▄▅▆▇█"
+server_streams: Dict[str, "ServerStream"] = {}
+
+def _fmt_bytes(n: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(n) < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
+
+def _sparkline(values: List[float], top: Optional[float] = None) -> str:
+    if not values:
+        return ""
+    top = top or max(values) or 1
+    return "".join(_SPARK_BARS[min(int(v / top * (len(_SPARK_BARS) - 1) + 0.5), len(_SPARK_BARS) - 1)] for v in values)
+
+class ServerStream:
+    def __init__(self, identifier: str):
+        self.identifier = identifier
+        self.lines: deque = deque(maxlen=CONSOLE_LINES)
+        self.samples: deque = deque(maxlen=STATS_HISTORY)  # (time, cpu %, memory, disk, rx B/s, tx B/s)
+        self.last_stats: Dict[str, Any] = {}
+        self.limits: Optional[Dict[str, Any]] = None       # the server's limits (MB / %), for the stats view
+        # viewer message id -> channel_id, message_id, user_id, key, kind, expires, seen, next_edit
+        self.viewers: Dict[int, Dict[str, Any]] = {}
+        self.versions = {"console": 0, "stats": 0}        # bumped on every change a view would show
+        self.state = "connecting"
+        self.closed = False
+        self.ws: Optional[aiohttp.ClientWebSocketResponse] = None
+
+    def watch(self, message: discord.Message, user_id: int, key: str, kind: str) -> None:
+        # (re)starting a view in the same channel moves it to the new message
+        for mid, v in list(self.viewers.items()):
+            if v["user_id"] == user_id and v["channel_id"] == message.channel.id and v["kind"] == kind:
+                del self.viewers[mid]
+        self.viewers[message.id] = {"channel_id": message.channel.id, "message_id": message.id, "user_id": user_id, "key": key,
+                                    "kind": kind, "expires": time.monotonic() + CONSOLE_IDLE_TIMEOUT, "seen": -1, "next_edit": 0.0}
+
+    def _changed(self, *kinds: str) -> None:
+        for kind in kinds or self.versions:
+            self.versions[kind] += 1
+
+    def _footer(self, kind: str) -> str:
+        return f"Updates for {CONSOLE_IDLE_TIMEOUT // 60} min; run `{PREFIX}{kind} {self.identifier}` again to extend."
+
+    def render(self, kind: str, note: Optional[str] = None) -> str:
+        if kind == "stats":
+            return self.render_stats(note)
+        body = "\n".join(self.lines).replace("```", "`\u200b``")
+        while len(body) > 1800:
+            body = body[body.find("\n") + 1:] if "\n" in body else body[-1800:]
+        return f"🖥️ Console `{self.identifier}` — {self.state}\n```\n{body or ' '}\n```\n{note or self._footer('console')}"
+
+    def render_stats(self, note: Optional[str] = None) -> str:
+        head = f"📊 Stats `{self.identifier}` — {self.state}"
+        if not self.samples:
+            return f"{head}\nWaiting for the first sample...\n{note or self._footer('stats')}"
+        limits = self.limits or {}
+        _, cpu, mem, disk, rx, tx = self.samples[-1]
+        cpus = [s[1] for s in self.samples]
+        mems = [s[2] for s in self.samples]
+        nets = [s[4] + s[5] for s in self.samples]
+        mem_limit = self.last_stats.get("memory_limit_bytes") or int(limits.get("memory", 0) or 0) * 1024 * 1024
+        disk_limit = int(limits.get("disk", 0) or 0) * 1024 * 1024
+        cpu_limit = int(limits.get("cpu", 0) or 0)
+        uptime = int(self.last_stats.get("uptime", 0) or 0) // 1000
+        rows = [
+            f"CPU     {cpu:6.1f}% / {f'{cpu_limit}%' if cpu_limit else '∞'}  {_sparkline(cpus, cpu_limit or None)}",
+            f"Memory  {_fmt_bytes(mem)} / {_fmt_bytes(mem_limit) if mem_limit else '∞'}  {_sparkline(mems, mem_limit or None)}",
+            f"Disk    {_fmt_bytes(disk)} / {_fmt_bytes(disk_limit) if disk_limit else '∞'}",
+            f"Network ↓ {_fmt_bytes(rx)}/s  ↑ {_fmt_bytes(tx)}/s  {_sparkline(nets)}",
+            f"Uptime  {uptime // 3600}h{uptime % 3600 // 60:02d}m  ({len(self.samples)} samples)",
+        ]
+        return f"{head}\n```\n" + "\n".join(rows) + f"\n```\n{note or self._footer('stats')}"
+
+    def _append(self, line: str) -> None:
+        self.lines.append(_ANSI_ESCAPE.sub("", str(line)).rstrip())
+        self._changed("console")
+
+    def _sample(self, raw: Any) -> None:
+        try:
+            st = json.loads(raw) if isinstance(raw, str) else dict(raw)
+        except (TypeError, ValueError):
+            return
+        now = time.monotonic()
+        net = st.get("network", {})
+        rx_total, tx_total = int(net.get("rx_bytes", 0) or 0), int(net.get("tx_bytes", 0) or 0)
+        rx = tx = 0.0
+        if self.samples and self.last_stats:
+            elapsed = max(now - self.samples[-1][0], 0.001)
+            prev = self.last_stats.get("network", {})
+            # counters restart with the server; a drop means "no rate this time"
+            rx = max(rx_total - int(prev.get("rx_bytes", 0) or 0), 0) / elapsed
+            tx = max(tx_total - int(prev.get("tx_bytes", 0) or 0), 0) / elapsed
+        self.samples.append((now, float(st.get("cpu_absolute", 0) or 0), int(st.get("memory_bytes", 0) or 0),
+                             int(st.get("disk_bytes", 0) or 0), rx, tx))
+        self.last_stats = st
+        self._changed("stats")
+
+    async def _credentials(self) -> Optional[Tuple[str, str]]:
+        # any current viewer's key will do; all of them were checked against this server
+        for v in list(self.viewers.values()):
+            status, js, text = await request_client(v["key"], "GET", f"/servers/{self.identifier}/websocket")
+            if status == 200 and js and js.get("data"):
+                return js["data"]["token"], js["data"]["socket"]
+        return None
+
+    async def _pump(self, ws: aiohttp.ClientWebSocketResponse) -> None:
+        async for msg in ws:
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                return
+            try:
+                event = json.loads(msg.data)
+            except ValueError:
+                continue
+            name, args = event.get("event"), event.get("args") or []
+            if name == "auth success":
+                await ws.send_json({"event": "send logs", "args": [None]})
+                await ws.send_json({"event": "send stats", "args": [None]})
+            elif name == "console output":
+                for line in args:
+                    self._append(line)
+            elif name == "stats" and args:
+                self._sample(args[0])
+            elif name == "status" and args:
+                self.state = args[0]
+                self._changed()
+            elif name in ("token expiring", "token expired"):
+                creds = await self._credentials()
+                if not creds:
+                    return
+                await ws.send_json({"event": "auth", "args": [creds[0]]})
+            elif name in ("jwt error", "daemon error"):
+                self._append(f"[{name}] {' '.join(map(str, args))}")
+
+    async def _render_loop(self) -> None:
+        while True:
+            # one edit per viewer per tick, so the tick stretches with the audience
+            await asyncio.sleep(max(len(self.viewers), 1) / CONSOLE_EDITS_PER_SECOND)
+            now = time.monotonic()
+            for mid, v in list(self.viewers.items()):
+                if v["expires"] <= now:
+                    del self.viewers[mid]
+                    await edit_status_message(v, self.render(v["kind"], f"⏹ {v['kind'].capitalize()} view closed (idle)."))
+            if not self.viewers:
+                self.closed = True
+                if self.ws is not None:
+                    await self.ws.close()
+                return
+            for v in list(self.viewers.values()):
+                version = self.versions[v["kind"]]
+                if v["seen"] == version or now < v["next_edit"]:
+                    continue
+                v["seen"] = version
+                if v["kind"] == "stats":
+                    v["next_edit"] = now + STATS_REFRESH_INTERVAL
+                await edit_status_message(v, self.render(v["kind"]))
+
+    async def run(self) -> None:
+        renderer = asyncio.create_task(self._render_loop())
+        failures = 0
+        try:
+            while not self.closed:
+                creds = await self._credentials()
+                if not creds:
+                    self.state = "no access"
+                    break
+                try:
+                    async with get_stream_session().ws_connect(creds[1], headers={"Origin": PANEL_URL}, heartbeat=30) as ws:
+                        self.ws = ws
+                        await ws.send_json({"event": "auth", "args": [creds[0]]})
+                        failures = 0
+                        await self._pump(ws)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    self._append(f"[bot] websocket error: {e}")
+                finally:
+                    self.ws = None
+                failures += 1
+                if self.closed or failures > CONSOLE_RECONNECTS:
+                    break
+                self.state = "reconnecting"
+                self._changed()
+                await asyncio.sleep(min(2 ** failures, 30))
+        finally:
+            self.closed = True
+            renderer.cancel()
+            if server_streams.get(self.identifier) is self:
+                del server_streams[self.identifier]
+            for v in list(self.viewers.values()):
+                await edit_status_message(v, self.render(v["kind"], "⏹ Disconnected."))
+
+async def watch_server_stream(ctx: commands.Context, identifier: str, kind: str) -> None:
+    key, identifier = await _manage_server_or_reply(ctx, identifier)
+    if not key: return
+    # checks this user's access before they join a shared socket
+    status, js, text = await request_client(key, "GET", f"/servers/{identifier}/websocket")
+    if status != 200:
+        return await ctx.reply(f"❌ Cannot connect to `{identifier}` ({status}): {text[:300]}")
+    current = server_streams.get(identifier)
+    if current is None or current.closed:
+        if sum(not s.closed for s in server_streams.values()) >= CONSOLE_MAX_STREAMS:
+            return await ctx.reply(f"❌ Too many live views are open right now (max {CONSOLE_MAX_STREAMS} servers). Try again later.")
+        current = ServerStream(identifier)
+    if kind == "stats" and current.limits is None:
+        status, js, text = await request_client(key, "GET", f"/servers/{identifier}")
+        current.limits = (js or {}).get("attributes", {}).get("limits", {}) if status == 200 else {}
+    msg = await ctx.reply(current.render(kind))
+    # the stream may have closed during the awaits above, so pick it only now
+    stream, created = await _live_server_stream(identifier)
+    if stream.limits is None:
+        stream.limits = current.limits
+    stream.watch(msg, ctx.author.id, key, kind)
+    if created:
+        start_background_task(f"server_stream_{identifier}", stream.run)
+
+async def _live_server_stream(identifier: str) -> Tuple["ServerStream", bool]:
+    # the server's open stream, or a new one once the previous one has fully shut down;
+    # returns without awaiting after the lookup, so the caller can attach before it closes
+    while True:
+        stream = server_streams.get(identifier)
+        if stream is not None and not stream.closed:
+            return stream, False
+        old = _background_tasks.get(f"server_stream_{identifier}")
+        if old is None or old.done():
+            break
+        # still shutting down; the new stream needs its task name
+        await asyncio.wait([old])
+    stream = server_streams[identifier] = ServerStream(identifier)
+    return stream, True
+
+@bot.command(name="console")
+async def console_cmd(ctx, identifier: str):
+    await watch_server_stream(ctx, identifier, "console")
+
+@bot.command(name="stats")
+async def stats_cmd(ctx, identifier: str):
+    await watch_server_stream(ctx, identifier, "stats")
 
 # -------------------- GET SERVER INTERNAL ID --------------------
 async def get_server_internal_id(identifier):
-    url = "https://panel.fluidmc.fun/api/application/servers"
-    headers = {"Authorization": f"Bearer {API_KEY}", "Accept": "application/json"}
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, headers=headers) as resp:
-            if resp.status != 200:
-                return None
-            data = await resp.json()
-            for s in data.get("data", []):
-                if s['attributes']['identifier'] == identifier:
-                    return s['attributes']['id']
-    return None
+    e = server_index.get(identifier)
+    if e:
+        return e["id"]
+    # not indexed yet (e.g. created from the panel since the last refresh)
+    s = await find_app_item("/servers", lambda a: a.get("identifier") == identifier, params={"filter[uuidShort]": identifier})
+    if not s:
+        return None
+    server_index.add(s)
+    return s["id"]
 # -------------------- ADMIN CREATE ACCOUNT --------------------
 @bot.command(name="create_ad")
 async def create_ad(ctx, email: str, password: str, is_admin: str):
     if not await require_admin_ctx(ctx):
         return await ctx.reply("❌ Only admins can use this command.")
 
-    url = "https://panel.fluidmc.fun/api/application/users"
-    headers = {"Authorization": f"Bearer {API_KEY}", "Accept": "application/json", "Content-Type": "application/json"}
     payload = {
         "email": email,
         "username": email.split("@")[0],
@@ -672,21 +2979,38 @@ async def create_ad(ctx, email: str, password: str, is_admin: str):
         "language": "en"
     }
 
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url, headers=headers, json=payload) as resp:
-            if resp.status == 201:
-                return await ctx.reply(f"✅ Created account for `{email}` | Admin: {is_admin}")
-            else:
-                err = await resp.text()
-                return await ctx.reply(f"❌ Failed to create account. ({resp.status})\n{err}")
+    status, js, err = await request_app("POST", "/users", json_payload=payload)
+    if status == 201:
+        if js and js.get("attributes", {}).get("id") is not None:
+            user_cache.put(email, int(js["attributes"]["id"]))
+        return await ctx.reply(f"✅ Created account for `{email}` | Admin: {is_admin}")
+    return await ctx.reply(f"❌ Failed to create account. ({status})\n{err}")
 
 # =========================
 # Node status
 # =========================
 @bot.command(name="node")
-async def node_cmd(ctx):
-    free, total = await node_stats()
-    await ctx.reply(f"🖥 Node `{PANEL_NODE_ID}` allocations: **{free} free / {total} total**")
+async def node_cmd(ctx, node_id: Optional[str] = None):
+    if node_cache.loaded_at is None:
+        await node_cache.refresh()  # only before the poller's first sweep
+    nodes = node_cache.nodes
+    if not nodes:
+        return await ctx.reply("❌ Node stats are not available yet.")
+    if node_id is not None and node_id not in nodes:
+        return await ctx.reply(f"❌ Unknown node. Nodes: {', '.join(f'`{n}`' for n in nodes)}")
+    shown = [node_id] if node_id is not None else list(nodes)
+    age = int(time.monotonic() - node_cache.loaded_at)
+    stale = " ⚠️ stale" if age > 2 * NODE_STATS_INTERVAL else ""
+    blocks = [node_stats_text(n, nodes[n]) for n in shown] + [f"🕒 Updated {age}s ago{stale}"]
+    # stay under Discord's 2000 character message limit
+    text = blocks[0]
+    for block in blocks[1:]:
+        if len(text) + len(block) > 1900:
+            await ctx.reply(text)
+            text = block
+        else:
+            text += "\n\n" + block
+    await ctx.reply(text)
 
 # =========================
 # Moderation
@@ -708,14 +3032,14 @@ async def clear_cmd(ctx, amount: int = 10):
 @bot.group(name="admin", invoke_without_command=True)
 async def admin_grp(ctx):
     if not await require_admin_ctx(ctx): return
-    await ctx.reply("Use admin subcommands (add_i/remove_i/add_a/rm_a/create_a/rm_ac/create_s/delete_s/serverlist/newmsg/lock/unlock)")
+    await ctx.reply("Use admin subcommands (add_i/remove_i/add_a/rm_a/create_a/rm_ac/create_s/bulk_create/bulk/delete_s/serverlist/stats/tiers/breaker/newmsg/lock/unlock)")
 
 @admin_grp.command(name="add_i")
 async def admin_add_i(ctx, member: discord.Member, amount: int):
     if not await require_admin_ctx(ctx): return
     inv = data.setdefault("invites", {})
     inv[str(member.id)] = int(inv.get(str(member.id), 0)) + amount
-    save_data(data)
+    await save_data("invites")
     await ctx.reply(f"✅ Added {amount} invites to {member.mention} (now {inv[str(member.id)]}).")
 
 @admin_grp.command(name="remove_i")
@@ -723,7 +3047,7 @@ async def admin_remove_i(ctx, member: discord.Member, amount: int):
     if not await require_admin_ctx(ctx): return
     inv = data.setdefault("invites", {})
     inv[str(member.id)] = max(0, int(inv.get(str(member.id), 0)) - amount)
-    save_data(data)
+    await save_data("invites")
     await ctx.reply(f"✅ Removed {amount} invites from {member.mention} (now {inv[str(member.id)]}).")
 
 @admin_grp.command(name="add_a")
@@ -732,7 +3056,7 @@ async def admin_add_a(ctx, member: discord.Member):
     admins = set(data.get("admins", []))
     admins.add(str(member.id))
     data["admins"] = list(admins)
-    save_data(data)
+    await save_data("admins")
     await ctx.reply(f"✅ {member.mention} added to bot-admins.")
 
 @admin_grp.command(name="rm_a")
@@ -741,7 +3065,7 @@ async def admin_rm_a(ctx, member: discord.Member):
     admins = set(data.get("admins", []))
     admins.discard(str(member.id))
     data["admins"] = list(admins)
-    save_data(data)
+    await save_data("admins")
     await ctx.reply(f"✅ {member.mention} removed from bot-admins.")
 
 @admin_grp.command(name="create_a")
@@ -751,7 +3075,7 @@ async def admin_create_a(ctx, member: discord.Member, email: str, password: str)
     if not uid:
         return await ctx.reply("❌ Failed to create panel user.")
     data.setdefault("panel_users", {})[str(member.id)] = uid
-    save_data(data)
+    await save_data("panel_users")
     await ctx.reply(f"✅ Created panel user `{uid}` and linked to {member.mention}")
 
 @admin_grp.command(name="rm_ac")
@@ -759,19 +3083,19 @@ async def admin_rm_ac(ctx, member: discord.Member):
     if not await require_admin_ctx(ctx): return
     pu = data.get("panel_users", {}).pop(str(member.id), None)
     if pu:
-        save_data(data)
+        await save_data("panel_users")
         await ctx.reply(f"✅ Unlinked panel user from {member.mention}")
     else:
         await ctx.reply("Nothing to unlink.")
 
 @admin_grp.command(name="create_s")
-async def admin_create_s(ctx, owner_email: str, egg: str, name: str, ram: int, cpu: int, disk: int):
+async def admin_create_s(ctx, owner_email: str, egg: str, name: str, ram: int, cpu: int, disk: int, nodeid: Optional[str] = None):
     if not await require_admin_ctx(ctx): return
     uid = await find_panel_user_by_email(owner_email)
     if not uid:
         return await ctx.reply("❌ Owner email not found in panel.")
     await ctx.reply("⚙️ Creating server...")
-    ok, msg = await create_server_app(name=name, owner_panel_id=uid, egg_key=egg, memory=ram, cpu=cpu, disk=disk)
+    ok, msg = await create_server_app(name=name, owner_panel_id=uid, egg_key=egg, memory=ram, cpu=cpu, disk=disk, node=nodeid)
     await ctx.reply(msg)
 
 @admin_grp.command(name="delete_s")
@@ -780,6 +3104,207 @@ async def admin_delete_s(ctx, server_id: int):
     ok, msg = await delete_server_app(server_id)
     await ctx.reply(msg)
 
+def parse_bulk_manifest(filename: str, raw: bytes) -> List[Dict[str, Any]]:
+    # CSV with a header row, or a JSON list of objects (optionally under "servers")
+    text = raw.decode("utf-8-sig")
+    if filename.lower().endswith(".json"):
+        rows = json.loads(text)
+        if isinstance(rows, dict):
+            rows = rows.get("servers", [])
+        if not isinstance(rows, list):
+            raise ValueError("expected a list of servers")
+        return [r if isinstance(r, dict) else {} for r in rows]
+    return [{(k or "").strip().lower(): (v or "").strip() for k, v in r.items()} for r in csv.DictReader(io.StringIO(text))]
+
+def bulk_row_server(row: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], str]:
+    # (create_server_app kwargs minus the owner, error)
+    missing = [k for k in ("email", "egg", "name", "ram", "cpu", "disk") if not str(row.get(k, "")).strip()]
+    if missing:
+        return None, f"missing {', '.join(missing)}"
+    egg = str(row["egg"]).strip()
+    if egg not in EGG_CATALOG:
+        return None, f"unknown egg `{egg}`"
+    try:
+        memory, cpu, disk = (int(row[k]) for k in ("ram", "cpu", "disk"))
+    except (TypeError, ValueError):
+        return None, "ram/cpu/disk must be whole numbers"
+    node = str(row.get("node") or "").strip() or None
+    return {"name": str(row["name"]).strip(), "egg_key": egg, "memory": memory, "cpu": cpu, "disk": disk, "node": node}, ""
+
+@admin_grp.command(name="bulk_create")
+async def admin_bulk_create(ctx):
+    if not await require_admin_ctx(ctx): return
+    if not ctx.message.attachments:
+        return await ctx.reply("❌ Attach a CSV or JSON manifest with columns: email, egg, name, ram, cpu, disk[, node]")
+    attachment = ctx.message.attachments[0]
+    try:
+        rows = parse_bulk_manifest(attachment.filename, await attachment.read())
+    except Exception as e:
+        return await ctx.reply(f"❌ Could not read the manifest: {e}")
+    if not rows:
+        return await ctx.reply("❌ The manifest has no rows.")
+    if len(rows) > BULK_CREATE_MAX_ROWS:
+        return await ctx.reply(f"❌ At most {BULK_CREATE_MAX_ROWS} rows per manifest.")
+
+    status_msg = await ctx.reply(f"⚙️ Resolving owners and allocations for {len(rows)} servers...")
+    results: List[Tuple[int, Dict[str, Any], str, str]] = []  # (row number, row, result, message)
+    servers = {}
+    for n, row in enumerate(rows, start=1):
+        server, error = bulk_row_server(row)
+        if server is None:
+            results.append((n, row, "invalid", error))
+        else:
+            servers[n] = server
+
+    # owners: one /users sweep serves every email; only unknown ones are looked up singly
+    if user_cache.stale():
+        await user_cache.refresh()
+    emails = {str(rows[n - 1]["email"]).strip() for n in servers}
+    sem = asyncio.Semaphore(BULK_CREATE_PARALLELISM)
+
+    async def lookup(email: str) -> Tuple[str, Optional[int]]:
+        async with sem:
+            return email, await find_panel_user_by_email(email)
+    owners = dict(await asyncio.gather(*(lookup(e) for e in emails)))
+
+    # allocations: fresh node stats and a loaded pool for every node before placing anything
+    await node_cache.refresh()
+    await asyncio.gather(*(allocation_pool(n).refresh() for n in node_cache.nodes if allocation_pool(n).loaded_at is None))
+
+    done = 0
+    last_edit = time.monotonic()
+
+    async def create(n: int, server: Dict[str, Any]) -> None:
+        nonlocal done, last_edit
+        row = rows[n - 1]
+        uid = owners.get(str(row["email"]).strip())
+        if not uid:
+            results.append((n, row, "failed", "owner email not found in panel"))
+        else:
+            async with sem:
+                _command_deadline.set(time.monotonic() + COMMAND_DEADLINE)  # per server, not for the whole manifest
+                try:
+                    ok, msg = await create_server_app(owner_panel_id=uid, **server)
+                except Exception as e:
+                    ok, msg = False, f"❌ Error: {e}"
+            results.append((n, row, "created" if ok else "failed", msg))
+        done += 1
+        if time.monotonic() - last_edit >= 5:
+            last_edit = time.monotonic()
+            try:
+                await status_msg.edit(content=f"⚙️ Creating servers: {done}/{len(servers)} done...")
+            except discord.HTTPException:
+                pass
+
+    await asyncio.gather(*(create(n, s) for n, s in servers.items()))
+
+    results.sort(key=lambda r: r[0])
+    report = io.StringIO()
+    writer = csv.writer(report)
+    writer.writerow(["row", "email", "name", "result", "message"])
+    for n, row, result, msg in results:
+        writer.writerow([n, row.get("email", ""), row.get("name", ""), result, msg])
+    counts = {k: sum(1 for r in results if r[2] == k) for k in ("created", "failed", "invalid")}
+    summary = f"📦 Bulk create finished: ✅ {counts['created']} created | ❌ {counts['failed']} failed | ⚠️ {counts['invalid']} invalid rows"
+    await ctx.reply(summary, file=discord.File(io.BytesIO(report.getvalue().encode("utf-8")), filename="bulk_create_report.csv"))
+    try:
+        await status_msg.edit(content=summary)
+    except discord.HTTPException:
+        pass
+
+# action -> servers it does not apply to (they are skipped, not failed)
+BULK_ACTIONS: Dict[str, Callable[[Dict[str, Any]], bool]] = {
+    "suspend": lambda e: e["suspended"],
+    "unsuspend": lambda e: not e["suspended"],
+    "reinstall": lambda e: e["suspended"],
+}
+
+def _parse_panel_time(value: Optional[str]) -> Optional[datetime.datetime]:
+    try:
+        return datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except Exception:
+        return None
+
+async def server_filter(tokens: List[str]) -> Callable[[Dict[str, Any]], bool]:
+    # owner:<email|panel user id> egg:<egg key|egg id> node:<id> name:<glob> inactive:<days>; all must match
+    checks: List[Callable[[Dict[str, Any]], bool]] = []
+    for token in tokens:
+        key, sep, value = token.partition(":")
+        key = key.lower()
+        if not sep or not value:
+            raise ValueError(f"bad filter `{token}`, expected key:value")
+        if key == "owner":
+            owner = int(value) if value.isdigit() else await find_panel_user_by_email(value)
+            if owner is None:
+                raise ValueError(f"no panel user `{value}`")
+            checks.append(lambda e, owner=owner: e["owner"] == owner)
+        elif key == "egg":
+            egg_id = int(value) if value.isdigit() else EGG_CATALOG.get(value, {}).get("egg_id")
+            if egg_id is None:
+                raise ValueError(f"unknown egg `{value}`")
+            checks.append(lambda e, egg_id=egg_id: e["egg"] == egg_id)
+        elif key == "node":
+            checks.append(lambda e, node=value: str(e["node"]) == node)
+        elif key == "name":
+            checks.append(lambda e, pattern=value.lower(): fnmatch.fnmatch((e["name"] or "").lower(), pattern))
+        elif key == "inactive":
+            # the Application API has no last-activity field; updated_at is the closest signal
+            cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=float(value))
+            checks.append(lambda e, cutoff=cutoff: (_parse_panel_time(e["updated_at"]) or cutoff) < cutoff)
+        else:
+            raise ValueError(f"unknown filter `{key}`")
+    if not checks:
+        raise ValueError("give at least one filter")
+    return lambda e: all(check(e) for check in checks)
+
+@admin_grp.command(name="bulk")
+async def admin_bulk(ctx, action: str, *filters: str):
+    if not await require_admin_ctx(ctx): return
+    action = action.lower()
+    if action not in BULK_ACTIONS:
+        return await ctx.reply(f"❌ Action must be one of: {', '.join(BULK_ACTIONS)}")
+    dry_run = any(f.lower() in ("dry", "--dry-run") for f in filters)
+    try:
+        matches = await server_filter([f for f in filters if f.lower() not in ("dry", "--dry-run")])
+    except ValueError as e:
+        return await ctx.reply(f"❌ {e}\nFilters: `owner:<email|id>` `egg:<key|id>` `node:<id>` `name:<pattern>` `inactive:<days>`, add `dry` to preview")
+    if server_index.loaded_at is None:
+        await server_index.refresh()
+    selected = [e for e in server_index.by_id.values() if matches(e)]
+    not_applicable = BULK_ACTIONS[action]
+    targets = [e for e in selected if not not_applicable(e)]
+    skipped = len(selected) - len(targets)
+    age = int((datetime.datetime.utcnow() - server_index.loaded_at).total_seconds()) if server_index.loaded_at else 0
+
+    if dry_run or not targets:
+        lines = [f"🔎 {'Dry run: ' if dry_run else ''}{len(targets)} servers would be {action}ed, {skipped} skipped (index refreshed {age}s ago)"]
+        lines += [f"- `{e['identifier']}` {e['name']} (ID {e['id']}, owner {e['owner']}, node {e['node']})" for e in targets[:20]]
+        if len(targets) > 20:
+            lines.append(f"... and {len(targets) - 20} more")
+        return await ctx.reply("\n".join(lines)[:1900])
+
+    await ctx.reply(f"⚙️ Running {action} on {len(targets)} servers ({skipped} skipped)...")
+    sem = asyncio.Semaphore(BULK_ACTION_PARALLELISM)
+    failures: List[str] = []
+
+    async def apply(e: Dict[str, Any]) -> None:
+        async with sem:
+            _command_priority.set(2)  # yield to interactive commands in the rate limiter
+            _command_deadline.set(time.monotonic() + COMMAND_DEADLINE)
+            if action == "reinstall":
+                status, js, text = await request_app("POST", f"/servers/{e['id']}/reinstall", retry=True)
+            else:
+                status, text = await set_server_suspended(e["id"], action == "suspend")
+            if status not in (202, 204):
+                failures.append(f"- `{e['identifier']}` {e['name']}: {status} {text[:80]}")
+
+    await asyncio.gather(*(apply(e) for e in targets))
+    lines = [f"🧹 Bulk {action}: ✅ {len(targets) - len(failures)} done | ⏭ {skipped} skipped | ❌ {len(failures)} failed"]
+    lines += failures[:10]
+    if len(failures) > 10:
+        lines.append(f"... and {len(failures) - 10} more failures")
+    await ctx.reply("\n".join(lines)[:1900])
+
 @admin_grp.command(name="serverlist")
 async def admin_serverlist(ctx):
     if not await require_admin_ctx(ctx): return
@@ -789,6 +3314,55 @@ async def admin_serverlist(ctx):
     lines = [f"- ID `{s['id']}` | {s['name']} | ident `{s['identifier']}` | RAM {s['limits'].get('memory','?')}MB" for s in servers]
     await ctx.reply("\n".join(lines)[:1900])
 
+@admin_grp.command(name="stats")
+async def admin_stats(ctx):
+    if not await require_admin_ctx(ctx): return
+    rows: Dict[str, Dict[str, Any]] = {}
+    for key, h in metrics.values.get("panel_request_duration_seconds", {}).items():
+        labels = dict(key)
+        r = rows.setdefault(f"{labels['method']} {labels['api']}{labels['endpoint']}", {"count": 0, "failed": 0, "sum": 0.0, "buckets": [0] * len(LATENCY_BUCKETS)})
+        r["count"] += h["count"]
+        r["sum"] += h["sum"]
+        r["buckets"] = [a + b for a, b in zip(r["buckets"], h["buckets"])]
+        if labels["outcome"] not in ("2xx", "3xx"):
+            r["failed"] += h["count"]
+    if not rows:
+        return await ctx.reply("No panel requests recorded yet.")
+    lines = [
+        f"`{ep}` — {r['count']} calls, {r['failed']} failed, avg {r['sum'] / r['count'] * 1000:.0f}ms, p95 ≤{histogram_quantile(r, 0.95) * 1000:.0f}ms"
+        for ep, r in sorted(rows.items(), key=lambda kv: kv[1]["sum"], reverse=True)
+    ]
+    em = discord.Embed(title="Panel API stats", description="\n".join(lines)[:4000], color=discord.Color.teal())
+    em.set_footer(text="Sorted by total time spent" + (f" • /metrics on {METRICS_HOST}:{METRICS_PORT}" if METRICS_PORT else ""))
+    await ctx.reply(embed=em)
+
+@admin_grp.command(name="tiers")
+async def admin_tiers(ctx):
+    if not await require_admin_ctx(ctx): return
+    by_user = tiers.for_users()
+    counts = {p.name: 0 for p in tiers.plans}
+    for plan in by_user.values():
+        counts[plan.name] += 1
+    invites = data.get("invites", {})
+    top = sorted(by_user, key=lambda uid: int(invites.get(uid, 0)), reverse=True)[:10]
+    lines = ["📊 Users per tier: " + " | ".join(f"{name} {n}" for name, n in counts.items())]
+    lines += [f"{i}. <@{uid}> — {invites.get(uid, 0)} invites ({by_user[uid].name})" for i, uid in enumerate(top, start=1)]
+    await ctx.reply("\n".join(lines), allowed_mentions=discord.AllowedMentions.none())
+
+@admin_grp.command(name="breaker")
+async def admin_breaker(ctx):
+    if not await require_admin_ctx(ctx): return
+    icon = {"closed": "🟢", "half-open": "🟡", "open": "🔴"}[breaker.state]
+    since = int(time.monotonic() - breaker.changed_at)
+    lines = [f"{icon} Panel circuit breaker is **{breaker.state}** (for {since}s)"]
+    if breaker.reason:
+        lines.append(f"Reason: {breaker.reason}")
+    if breaker.state == "open":
+        lines.append(f"Next probe in {breaker.retry_in():.0f}s")
+    elif breaker.state == "closed":
+        lines.append(f"Last {BREAKER_WINDOW}s: {breaker.failures}/{len(breaker.events)} requests failed (opens at {BREAKER_ERROR_RATE:.0%} of ≥{BREAKER_MIN_REQUESTS})")
+    await ctx.reply("\n".join(lines))
+
 @admin_grp.command(name="newmsg")
 async def admin_newmsg(ctx, channel_id: int, *, text: str):
     if not await require_admin_ctx(ctx): return
@@ -808,7 +3382,7 @@ async def admin_lock(ctx):
     locked_ids = set(map(int, data.get("locked_channels", [])))
     locked_ids.add(ch.id)
     data["locked_channels"] = list(map(str, locked_ids))
-    save_data(data)
+    await save_data("locked_channels")
     await ctx.reply("🔒 Channel locked.")
 
 @admin_grp.command(name="unlock")
@@ -822,7 +3396,7 @@ async def admin_unlock(ctx):
     if ch.id in locked_ids:
         locked_ids.remove(ch.id)
     data["locked_channels"] = list(map(str, locked_ids))
-    save_data(data)
+    await save_data("locked_channels")
     await ctx.reply("🔓 Channel unlocked.")
 
 # ==========================
@@ -833,14 +3407,12 @@ async def suspend_server(ctx, serverid: str):
     if str(ctx.author.id) not in ADMIN_IDS:
         return await ctx.reply("❌ You are not authorized to use this command.")
 
-    url = f"{PANEL_URL}/api/application/servers/{serverid}/suspend"
-    headers = {"Authorization": f"Bearer {APP_API_KEY}", "Content-Type": "application/json", "Accept": "application/json"}
-    r = requests.post(url, headers=headers)
+    status, text = await set_server_suspended(serverid, True)
 
-    if r.status_code == 204:
+    if status == 204:
         await ctx.reply(f"✅ Server `{serverid}` suspended successfully.")
     else:
-        await ctx.reply(f"❌ Failed to suspend server. ({r.text})")
+        await ctx.reply(f"❌ Failed to suspend server. ({status}: {text})")
 
 
 # ==========================
@@ -851,14 +3423,12 @@ async def unsuspend_server(ctx, serverid: str):
     if str(ctx.author.id) not in ADMIN_IDS:
         return await ctx.reply("❌ You are not authorized to use this command.")
 
-    url = f"{PANEL_URL}/api/application/servers/{serverid}/unsuspend"
-    headers = {"Authorization": f"Bearer {APP_API_KEY}", "Content-Type": "application/json", "Accept": "application/json"}
-    r = requests.post(url, headers=headers)
+    status, text = await set_server_suspended(serverid, False)
 
-    if r.status_code == 204:
+    if status == 204:
         await ctx.reply(f"✅ Server `{serverid}` unsuspended successfully.")
     else:
-        await ctx.reply(f"❌ Failed to unsuspend server. ({r.text})")
+        await ctx.reply(f"❌ Failed to unsuspend server. ({status}: {text})")
 
 
 # ==========================
@@ -866,17 +3436,14 @@ async def unsuspend_server(ctx, serverid: str):
 # ==========================
 @bot.command(name="createapikey")
 async def create_api_key(ctx, name: str):
-    url = f"{PANEL_URL}/api/client/account/api-keys"
-    headers = {"Authorization": f"Bearer {APP_API_KEY}", "Content-Type": "application/json", "Accept": "application/json"}
-    data = {"description": name}
-    r = requests.post(url, headers=headers, json=data)
+    status, js, text = await request_client(APP_API_KEY, "POST", "/account/api-keys", json_payload={"description": name})
 
-    if r.status_code in (200, 201):
-        api_key = r.json().get("secret")
+    if status in (200, 201) and js:
+        api_key = js.get("secret")
         await ctx.author.send(f"🔑 Your Client API Key: `{api_key}`")
         await ctx.reply("✅ API key created and sent to your DM.")
     else:
-        await ctx.reply(f"❌ Failed to create API key. ({r.text})")
+        await ctx.reply(f"❌ Failed to create API key. ({status}: {text})")
 
 
 # ==========================
@@ -891,15 +3458,12 @@ async def change_pass(ctx, email: str, old: str, new: str, confirm: str):
     if not user_id:
         return await ctx.reply("❌ User not found.")
 
-    url = f"{PANEL_URL}/api/application/users/{user_id}"
-    headers = {"Authorization": f"Bearer {APP_API_KEY}", "Content-Type": "application/json", "Accept": "application/json"}
-    data = {"password": new}
-    r = requests.patch(url, headers=headers, json=data)
+    status, js, text = await request_app("PATCH", f"/users/{user_id}", json_payload={"password": new})
 
-    if r.status_code == 200:
+    if status == 200:
         await ctx.reply(f"✅ Password updated for `{email}`.")
     else:
-        await ctx.reply(f"❌ Failed to change password. ({r.text})")
+        await ctx.reply(f"❌ Failed to change password. ({status}: {text})")
 
 
 # ==========================
@@ -914,29 +3478,15 @@ async def send_server(ctx, ram: int, cpu: int, disk: int, email: str, password:
     if not uid:
         return await ctx.reply("❌ User email not found.")
 
-    ok, msg = await create_server_app(
-        name=f"{usertag.name}_server",
-        owner_panel_id=uid,
-        egg_key="paper",
-        memory=ram,
-        cpu=cpu,
-        disk=disk
-    )
-
-    if ok:
-        try:
-            await usertag.send(
-                f"🎉 Your server has been created!\n"
-                f"🔗 Panel: {PANEL_URL}\n"
-                f"📧 Email: `{email}`\n"
-                f"🔑 Password: `{password}`\n"
-                f"💾 Specs: {ram}MB RAM | {cpu}% CPU | {disk}MB Disk"
-            )
-            await ctx.reply(f"✅ Server created and info sent to {usertag.mention}")
-        except:
-            await ctx.reply("⚠️ Could not DM user, maybe DMs are off.")
-    else:
-        await ctx.reply(f"❌ {msg}")
+    # the job DMs the login details once the server exists
+    await submit_server_job(ctx, "send", str(usertag.id), {
+        "name": f"{usertag.name}_server",
+        "owner_panel_id": uid,
+        "egg_key": "paper",
+        "memory": ram,
+        "cpu": cpu,
+        "disk": disk
+    }, secrets={"password": password}, email=email)
 
 
 # ==========================
@@ -947,14 +3497,48 @@ async def drop_msg(ctx, *, message: str):
     if str(ctx.author.id) not in ADMIN_IDS:
         return await ctx.reply("❌ You are not authorized to use this command.")
 
-    for member in ctx.guild.members:
-        try:
-            await member.send(f"📢 {message}")
-        except:
-            continue
-    await ctx.reply("✅ Broadcast message sent to all users.")
+    if ctx.guild is None:
+        return await ctx.reply("❌ Use this in a server.")
+    if broadcasts:
+        return await ctx.reply(f"⏳ Broadcast `{next(iter(broadcasts))}` is still running — `{PREFIX}dropcancel` to stop it.")
+
+    prune_broadcasts()
+    records = data.setdefault("broadcasts", {})
+    broadcast_id = f"{random.getrandbits(24):06x}"
+    while broadcast_id in records:
+        broadcast_id = f"{random.getrandbits(24):06x}"
+    reply = await ctx.reply(f"📢 Broadcast `{broadcast_id}` starting...")
+    records[broadcast_id] = {
+        "message": message,
+        "guild_id": ctx.guild.id,
+        "requester": str(ctx.author.id),
+        "channel_id": reply.channel.id,
+        "message_id": reply.id,
+        "status": "running",
+        "done_until": 0,
+        "delivered": 0,
+        "closed": 0,
+        "failed": 0,
+        "total": 0,
+        "created": time.time(),
+        "finished": None,
+    }
+    await save_data("broadcasts", durable=True)
+    start_broadcast(broadcast_id)
+
+@bot.command(name="dropcancel")
+async def drop_cancel(ctx):
+    if str(ctx.author.id) not in ADMIN_IDS:
+        return await ctx.reply("❌ You are not authorized to use this command.")
+    if not broadcasts:
+        return await ctx.reply("Nothing is being broadcast.")
+    for b in list(broadcasts.values()):
+        b.cancelled = True
+        b.record["status"] = "cancelled"
+    await ctx.reply("🛑 Broadcast cancelled; the progress message shows what was sent.")
 
 # =========================
 # Run bot
 # =========================
-bot.run(BOT_TOKEN)
+if __name__ == "__main__":
+    bot.run(BOT_TOKEN)